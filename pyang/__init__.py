@@ -6,6 +6,7 @@ import sys
 import zlib
 import re
 import io
+import json
 
 from . import error
 from . import yang_parser
@@ -13,6 +14,8 @@ from . import yin_parser
 from . import grammar
 from . import util
 from . import statements
+from . import types
+from . import plugin
 
 __version__ = '1.7'
 __date__ = '2016-06-16'
@@ -33,7 +36,7 @@ class Context(object):
 
         self.strict = False
         self.repository = repository
-        self.errors = []
+        self.errors = error.ErrorCollector()
         self.canonical = False
         self.max_line_len = None
         self.max_identifier_len = None
@@ -42,6 +45,21 @@ class Context(object):
         self.deviation_modules = []
         self.features = {}
         self.keep_comments = False
+        self.lazy_text = False
+        """if True, the arguments of description, reference, organization
+        and contact statements are parsed from the YANG source text when
+        they are first used"""
+        self.aborted = False
+        """set to True to stop the validation of the modules"""
+        self.parse_cache = None
+        """a `cache.ParseCache` instance, used to avoid re-parsing
+        unchanged YANG modules"""
+        self.validation_profile = None
+        """a `statements.ValidationProfile` instance, to record the time
+        spent in the validation phases and functions"""
+        self.identity_index = types.IdentityIndex()
+        """a `types.IdentityIndex` instance with all identities in the
+        validated modules"""
 
         for mod, rev, handle in self.repository.get_modules_and_revisions(self):
             if mod not in self.revs:
@@ -64,12 +82,7 @@ class Context(object):
         if format == None:
             format = util.guess_format(text)
 
-        if format == 'yin':
-            p = yin_parser.YinParser()
-        else:
-            p = yang_parser.YangParser()
-
-        module = p.parse(self, ref, text)
+        module = self._parse(ref, text, format)
         if module is None:
             return None
 
@@ -99,6 +112,15 @@ class Context(object):
 
         return self.add_parsed_module(module)
 
+    def _parse(self, ref, text, format, extra={}):
+        """Parse `text`, using the parse cache for YANG modules"""
+        if format == 'yin':
+            return yin_parser.YinParser(extra).parse(self, ref, text)
+        elif self.parse_cache is not None:
+            return self.parse_cache.parse(self, ref, text)
+        else:
+            return yang_parser.YangParser(extra).parse(self, ref, text)
+
     def add_parsed_module(self, module):
         if module is None:
             return None
@@ -127,6 +149,7 @@ class Context(object):
         """Remove a module from the context"""
         rev = util.get_latest_revision(module)
         del self.modules[(module.arg, rev)]
+        self.identity_index.del_module(module)
 
     def get_module(self, modulename, revision=None):
         """Return the module if it exists in the context"""
@@ -156,6 +179,12 @@ class Context(object):
             if rev is None:
                 # now we must read the revision from the module
                 try:
+                    rev = self.repository.get_module_revision(handle)
+                    if rev is not None:
+                        revs[i] = (rev, handle)
+                        i += 1
+                        continue
+                    # the header could not be scanned; parse the module
                     r = self.repository.get_module_from_handle(handle)
                 except self.repository.ReadError as ex:
                     i += 1
@@ -165,13 +194,9 @@ class Context(object):
                 if format == None:
                     format = util.guess_format(text)
 
-                if format == 'yin':
-                    p = yin_parser.YinParser({'no_include':True,
-                                              'no_extensions':True})
-                else:
-                    p = yang_parser.YangParser()
-
-                module = p.parse(self, ref, text)
+                module = self._parse(ref, text, format,
+                                     {'no_include':True,
+                                      'no_extensions':True})
                 if module is not None:
                     rev = util.get_latest_revision(module)
                     revs[i] = (rev, ('parsed', module, ref))
@@ -297,12 +322,7 @@ class Context(object):
                 if format == None:
                     format = util.guess_format(text)
 
-                if format == 'yin':
-                    p = yin_parser.YinParser(extra)
-                else:
-                    p = yang_parser.YangParser(extra)
-
-                return p.parse(self, ref, text)
+                return self._parse(ref, text, format, extra)
             except self.repository.ReadError as ex:
                 return None
 
@@ -322,6 +342,89 @@ class Context(object):
                     else:
                         uris[uri] = m.arg
 
+_filename_re = re.compile(r"^(.*?)(\@(\d{4}-\d{2}-\d{2}))?\.(yang|yin)$")
+
+def add_files(ctx, texts):
+    """Add the modules in `texts`, a list of (filename, text), to `ctx`.
+
+    Returns the modules added, and False if some module could not be
+    added."""
+    modules = []
+    ok = True
+    for (filename, text) in texts:
+        m = _filename_re.search(filename)
+        ctx.yin_module_map = {}
+        if m is not None:
+            (name, _dummy, rev, format) = m.groups()
+            name = os.path.basename(name)
+            module = ctx.add_module(filename, text, format, name, rev,
+                                    expect_failure_error=False)
+        else:
+            module = ctx.add_module(filename, text)
+        if module is None:
+            ok = False
+        else:
+            modules.append(module)
+    return (modules, ok)
+
+def get_modulenames(modules):
+    """Return the names of `modules` and the submodules they include"""
+    modulenames = []
+    for m in modules:
+        modulenames.append(m.arg)
+        for s in m.search('include'):
+            modulenames.append(s.arg)
+    return modulenames
+
+def validate_modules(ctx, modules, deviations, emit_obj=None):
+    """Apply the deviation modules in `deviations`, a list of
+    (filename, text), and validate `ctx`, calling the plugins' and
+    `emit_obj`'s validation hooks.
+
+    Returns the names of the `modules` and their submodules, and an
+    error message, or None."""
+    modulenames = get_modulenames(modules)
+
+    # apply deviations
+    for (filename, text) in deviations:
+        m = ctx.add_module(filename, text)
+        if m is not None:
+            ctx.deviation_modules.append(m)
+
+    for p in plugin.plugins:
+        p.pre_validate_ctx(ctx, modules)
+
+    if emit_obj is not None and len(modules) > 0:
+        emit_obj.pre_validate(ctx, modules)
+
+    ctx.validate()
+
+    # verify the given features
+    for m in modules:
+        if m.arg in ctx.features:
+            for f in ctx.features[m.arg]:
+                if f not in m.i_features:
+                    return (modulenames, "unknown feature %s in module %s" %
+                            (f, m.arg))
+
+    if emit_obj is not None and len(modules) > 0:
+        emit_obj.post_validate(ctx, modules)
+
+    for p in plugin.plugins:
+        p.post_validate_ctx(ctx, modules)
+
+    return (modulenames, None)
+
+def sort_errors(ctx, filenames):
+    """Sort the errors in `ctx` by position, with the errors in the
+    first of `filenames` first.  With --ignore-errors, all errors are
+    dropped."""
+    ctx.errors.sort(key=lambda e: (e[0].ref, e[0].line))
+    if len(filenames) > 0:
+        ctx.errors.sort(key=lambda e: e[0].ref != filenames[0])
+    if ctx.opts.ignore_errors:
+        ctx.errors = []
+
 class Repository(object):
     """Abstract base class that represents a module repository"""
 
@@ -348,6 +451,45 @@ class Repository(object):
         Raises `ReadError`
         """
 
+    def get_module_revision(self, handle):
+        """Return the latest revision of the module with `handle`
+
+        The revision is found by scanning the module header, without
+        parsing the module.  Returns the revision, 'unknown' if the
+        module has no revision, or None if the module header could not
+        be scanned.
+
+        Raises `ReadError`
+        """
+        (_ref, format, text) = self.get_module_from_handle(handle)
+        return self._header_revision(self.peek_header(text, format))
+
+    def peek_header(self, text, format=None):
+        """Scan the header of the module in `text` without parsing it
+
+        Returns a dict as described in `yang_parser.peek_header()`, or
+        None if the header could not be scanned.
+        """
+        if format == None:
+            format = util.guess_format(text)
+        if format == 'yin':
+            return yin_parser.peek_header(text)
+        else:
+            return yang_parser.peek_header(text)
+
+    def _header_revision(self, header):
+        if header is None:
+            return None
+        latest = None
+        for rev in header.get('revision', []):
+            if rev is None:
+                return None
+            if latest is None or rev > latest:
+                latest = rev
+        if latest is None:
+            return "unknown"
+        return latest
+
     class ReadError(Exception):
         """Signals that an error occured during module retrieval"""
 
@@ -355,15 +497,24 @@ class Repository(object):
             Exception.__init__(self, str)
 
 class FileRepository(Repository):
-    def __init__(self, path="", use_env=True, no_path_recurse=False):
+    revisions = {}
+    """Maps (absfilename, mtime, size) to the latest revision found in the
+    file.  Shared by all instances."""
+
+    def __init__(self, path="", use_env=True, no_path_recurse=False,
+                 index=None):
         """Create a Repository which searches the filesystem for modules
 
         `path` is a `os.pathsep`-separated string of directories
+        `index` is the name of an index file written by build_index().
+        Directories that have not been modified since the index was
+        built are not scanned.
         """
 
         Repository.__init__(self)
         self.dirs = path.split(os.pathsep)
         self.no_path_recurse = no_path_recurse
+        self.index_file = index
 
         if use_env:
             modpath = os.getenv('YANG_MODPATH')
@@ -382,60 +533,159 @@ class FileRepository(Repository):
                                               'share','yang','modules'))
 
         self.modules = None
+        self.index = {}
+        """dict of absolute directory name:<dir entry>
+        A dir entry is a dict with the directory's 'mtime', and
+        'entries', a list of [fname, name, rev, format, info] for
+        module files and [dirname] for subdirectories, in directory
+        order.  `info` is None or [mtime, size, revision, namespace]."""
 
     def _setup(self, ctx):
         # check all dirs for yang and yin files
         self.modules = []
-        r = re.compile(r"^(.*?)(\@(\d{4}-\d{2}-\d{2}))?\.(yang|yin)$")
+        if self.index_file is not None:
+            self._read_index()
         def add_files_from_dir(d):
-            try:
-                files = os.listdir(d)
-            except OSError:
-                files = []
-            for fname in files:
+            for e in self._get_dir_entry(d):
+                if len(e) == 1:
+                    if not self.no_path_recurse and d != '.':
+                        add_files_from_dir(os.path.join(d, e[0]))
+                    continue
+                (fname, name, rev, format, info) = e
                 absfilename = os.path.join(d, fname)
-                if os.path.isfile(absfilename):
-                    m = r.search(fname)
-                    if m is not None:
-                        (name, _dummy, rev, format) = m.groups()
-                        if not os.access(absfilename, os.R_OK): continue
-                        if absfilename.startswith("./"):
-                            absfilename = absfilename[2:]
-                        handle = (format, absfilename)
-                        self.modules.append((name, rev, handle))
-                elif (not self.no_path_recurse
-                      and d != '.' and os.path.isdir(absfilename)):
-                    add_files_from_dir(absfilename)
+                if absfilename.startswith("./"):
+                    absfilename = absfilename[2:]
+                if info is not None and info[2] is not None:
+                    (mtime, size, revision, _namespace) = info
+                    key = (absfilename, mtime, size)
+                    FileRepository.revisions[key] = revision
+                handle = (format, absfilename)
+                self.modules.append((name, rev, handle))
         for d in self.dirs:
             add_files_from_dir(d)
 
-    # FIXME: bad strategy; when revisions are not used in the filename
-    # this code parses all modules :(  need to do this lazily
-    def _peek_revision(self, absfilename, format, ctx):
+    def _get_dir_entry(self, d):
+        """Return the list of module files and subdirectories in `d`"""
         try:
-            fd = io.open(absfilename, "r", encoding="utf-8")
-            text = fd.read()
-        except IOError as ex:
-            return None
-        except UnicodeDecodeError as ex:
-            return None
-        if format == 'yin':
-            p = yin_parser.YinParser()
-        else:
-            p = yang_parser.YangParser()
+            mtime = os.stat(d).st_mtime
+        except OSError:
+            return []
+        key = os.path.abspath(d)
+        old = self.index.get(key)
+        if old is not None and old['mtime'] == mtime:
+            return old['entries']
+        oldinfo = {}
+        if old is not None:
+            for e in old['entries']:
+                if len(e) > 1:
+                    oldinfo[e[0]] = e[4]
+        r = re.compile(r"^(.*?)(\@(\d{4}-\d{2}-\d{2}))?\.(yang|yin)$")
+        try:
+            files = os.listdir(d)
+        except OSError:
+            files = []
+        entries = []
+        for fname in files:
+            absfilename = os.path.join(d, fname)
+            if os.path.isfile(absfilename):
+                m = r.search(fname)
+                if m is not None:
+                    (name, _dummy, rev, format) = m.groups()
+                    if not os.access(absfilename, os.R_OK): continue
+                    entries.append([fname, name, rev, format,
+                                    oldinfo.get(fname)])
+            elif os.path.isdir(absfilename):
+                entries.append([fname])
+        self.index[key] = {'mtime': mtime, 'entries': entries}
+        return entries
+
+    def _read_index(self):
+        try:
+            fd = io.open(self.index_file, "r", encoding="utf-8")
+            try:
+                index = json.load(fd)
+            finally:
+                fd.close()
+        except (IOError, ValueError):
+            # no index or a bad index; scan all directories
+            return
+        if index.get('version') == __version__:
+            self.index = index['dirs']
+
+    def build_index(self, filename):
+        """Scan the repository and write an index file to `filename`.
+
+        The index records the name, revision, format, mtime and
+        namespace of each module found in the directories of the
+        repository.
+
+        Raises `IOError`
+        """
+        self.index = {}
+        self.index_file = None
+        self._setup(None)
+        for d in self.index:
+            for e in self.index[d]['entries']:
+                if len(e) == 1:
+                    continue
+                absfilename = os.path.join(d, e[0])
+                try:
+                    st = os.stat(absfilename)
+                    fd = io.open(absfilename, "r", encoding="utf-8")
+                    try:
+                        text = fd.read()
+                    finally:
+                        fd.close()
+                except (IOError, OSError, UnicodeDecodeError):
+                    continue
+                header = self.peek_header(text, e[3])
+                revision = self._header_revision(header)
+                namespace = None
+                if header is not None and 'namespace' in header:
+                    namespace = header['namespace'][0]
+                e[4] = [st.st_mtime, st.st_size, revision, namespace]
+        tmpfile = filename + ".tmp"
+        fd = open(tmpfile, "wb")
+        try:
+            fd.write(json.dumps({'version': __version__, 'dirs': self.index},
+                                sort_keys=True).encode('utf-8'))
+        finally:
+            fd.close()
+        os.rename(tmpfile, filename)
 
-        # FIXME: optimization - do not parse the entire text
-        # just to read the revisions...
-        module = p.parse(ctx, absfilename, text)
-        if module is None:
-            return None
-        return (util.get_latest_revision(module), module)
+    def get_module_revision(self, handle):
+        (format, absfilename) = handle
+        try:
+            st = os.stat(absfilename)
+        except OSError as ex:
+            raise self.ReadError(absfilename + ": " + str(ex))
+        key = (absfilename, st.st_mtime, st.st_size)
+        try:
+            return FileRepository.revisions[key]
+        except KeyError:
+            pass
+        rev = Repository.get_module_revision(self, handle)
+        if rev is not None:
+            FileRepository.revisions[key] = rev
+        return rev
 
     def get_modules_and_revisions(self, ctx):
         if self.modules is None:
             self._setup(ctx)
         return self.modules
 
+    def refresh(self):
+        """Forget the modules found, so that modules added or removed
+        since the last scan are found by the next Context.
+
+        Only directories that have been modified since the last scan
+        are scanned again.
+        """
+        if self.modules is not None:
+            # the index file, if any, has already been read into self.index
+            self.index_file = None
+            self.modules = None
+
     def get_module_from_handle(self, handle):
         (format, absfilename) = handle
         try:
@@ -0,0 +1,240 @@
+"""On-disk cache of parsed YANG modules.
+
+The cache stores the raw statement tree produced by the YANG parser,
+i.e. the keyword, argument, line number and substatements of each
+statement, before any validation is done.  Text arguments that the
+parser leaves unparsed until they are used (see `Context.lazy_text`)
+are stored as their quoted source, and are again parsed on first use
+when the entry is loaded.  Entries are keyed by a hash of the module
+text, the pyang version, and the parser settings that affect the
+result.  Only texts that parse without any errors or warnings are
+stored, so a cache hit never hides a diagnostic.
+
+`MemoryParseCache` keeps the entries in memory instead, and is used by
+long-running processes such as the server in `pyang.serve`.
+"""
+
+import os
+import sys
+import hashlib
+import marshal
+import zlib
+import collections
+
+from . import error
+from . import statements
+from . import yang_parser
+
+class ParseCache(object):
+    """A directory of cached parse trees, with a bounded total size"""
+
+    def __init__(self, directory, max_size=100*1024*1024):
+        """`directory` is created if it does not exist.
+        `max_size` is the maximum total size in bytes of all entries."""
+        self.directory = directory
+        self.max_size = max_size
+        self.size = None
+        """Total size of the entries in the cache, computed lazily"""
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, ctx, text):
+        from . import __version__
+        h = hashlib.sha1()
+        h.update(('%s %s %s %s\0' % (__version__, sys.version_info[:2],
+                                     ctx.max_line_len,
+                                     ctx.keep_comments)).encode('utf-8'))
+        h.update(text.encode('utf-8'))
+        return h.hexdigest()
+
+    def parse(self, ctx, ref, text):
+        """Return the parsed YANG statement in `text`, or None on failure.
+
+        Behaves like yang_parser.YangParser().parse(ctx, ref, text).
+        """
+        key = self.key(ctx, text)
+        lazy_text = ctx.lazy_text and not ctx.keep_comments
+        stmt = self._load(key, ref, lazy_text)
+        if stmt is not None:
+            self.hits += 1
+            return stmt
+        self.misses += 1
+        nerrors = len(ctx.errors)
+        stmt = yang_parser.YangParser().parse(ctx, ref, text)
+        if stmt is not None and len(ctx.errors) == nerrors:
+            self._store(key, stmt)
+        return stmt
+
+    def _load(self, key, ref, lazy_text):
+        filename = os.path.join(self.directory, key)
+        try:
+            fd = open(filename, 'rb')
+            try:
+                data = fd.read()
+            finally:
+                fd.close()
+        except (IOError, OSError):
+            return None
+        try:
+            tree = marshal.loads(zlib.decompress(data))
+            stmt = _build_stmt(tree, ref, None, None, lazy_text)
+        except Exception:
+            # corrupt or incompatible entry, get rid of it
+            self._remove(filename)
+            return None
+        try:
+            # keep track of when the entry was last used, for eviction
+            os.utime(filename, None)
+        except OSError:
+            pass
+        return stmt
+
+    def _store(self, key, stmt):
+        filename = os.path.join(self.directory, key)
+        try:
+            data = zlib.compress(marshal.dumps(_dump_stmt(stmt)))
+        except ValueError:
+            # unmarshallable argument; do not cache this module
+            return
+        tmpfile = '%s.%d.tmp' % (filename, os.getpid())
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            fd = open(tmpfile, 'wb')
+            try:
+                fd.write(data)
+            finally:
+                fd.close()
+            os.rename(tmpfile, filename)
+        except (IOError, OSError):
+            self._remove(tmpfile)
+            return
+        if self.size is None:
+            self.size = self._total_size()
+        else:
+            self.size += len(data)
+        if self.size > self.max_size:
+            self.evict()
+
+    def _entries(self):
+        """Return a list of (mtime, size, filename) for all entries"""
+        res = []
+        try:
+            files = os.listdir(self.directory)
+        except OSError:
+            return res
+        for fname in files:
+            if fname.endswith('.tmp'):
+                continue
+            filename = os.path.join(self.directory, fname)
+            try:
+                st = os.stat(filename)
+            except OSError:
+                continue
+            res.append((st.st_mtime, st.st_size, filename))
+        return res
+
+    def _total_size(self):
+        return sum([size for (_mtime, size, _f) in self._entries()])
+
+    def _remove(self, filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def evict(self, max_size=None):
+        """Remove the least recently used entries until the total size
+        of the cache is below 90% of `max_size`."""
+        if max_size is None:
+            max_size = self.max_size
+        entries = self._entries()
+        entries.sort()
+        size = sum([size for (_mtime, size, _f) in entries])
+        limit = max_size * 0.9
+        for (_mtime, esize, filename) in entries:
+            if size <= limit:
+                break
+            self._remove(filename)
+            size -= esize
+        self.size = size
+
+    def clear(self):
+        """Remove all entries from the cache"""
+        self.evict(0)
+
+class MemoryParseCache(ParseCache):
+    """A parse cache kept in memory, for long-running processes"""
+
+    def __init__(self, max_size=100*1024*1024):
+        ParseCache.__init__(self, None, max_size)
+        self.entries = collections.OrderedDict()
+        """dict of key:marshalled tree, least recently used first"""
+        self.size = 0
+
+    def _load(self, key, ref, lazy_text):
+        data = self.entries.pop(key, None)
+        if data is None:
+            return None
+        self.entries[key] = data
+        return _build_stmt(marshal.loads(data), ref, None, None, lazy_text)
+
+    def _store(self, key, stmt):
+        try:
+            data = marshal.dumps(_dump_stmt(stmt))
+        except ValueError:
+            return
+        self.entries[key] = data
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self, max_size=None):
+        if max_size is None:
+            max_size = self.max_size
+        limit = max_size * 0.9
+        while self.entries and self.size > limit:
+            (_key, data) = self.entries.popitem(last=False)
+            self.size -= len(data)
+
+def _dump_stmt(stmt):
+    if (isinstance(stmt, yang_parser._LazyTextStatement) and
+        stmt.lazy_arg is not None):
+        # store the quoted string from the source text; reading
+        # stmt.arg would parse it
+        (text, start, end, indent) = stmt.lazy_arg
+        arg = None
+        lazy = (text[start:end], indent)
+    else:
+        arg = stmt.arg
+        lazy = None
+    return (stmt.raw_keyword, arg, stmt.pos.line,
+            tuple([_dump_stmt(s) for s in stmt.substmts]), lazy)
+
+def _build_stmt(tree, ref, top, parent, lazy_text):
+    """Build the statement in `tree`.  If `lazy_text` is set, a quoted
+    string stored by _dump_stmt() is parsed when it is first used, as
+    by the YANG parser with ctx.lazy_text."""
+    (keyword, arg, line, substmts, lazy) = tree
+    pos = error.Position(ref)
+    pos.line = line
+    if lazy is None:
+        stmt = statements.Statement(top, parent, pos, keyword, arg)
+    else:
+        (text, indent) = lazy
+        lazy_arg = (text, 0, len(text), indent)
+        if lazy_text:
+            stmt = yang_parser._LazyTextStatement(top, parent, pos, keyword,
+                                                  lazy_arg)
+        else:
+            stmt = statements.Statement(top, parent, pos, keyword,
+                                        yang_parser.parse_lazy_arg(lazy_arg))
+    if top is None:
+        pos.top = stmt
+        top = stmt
+    else:
+        pos.top = top
+    stmt.pos = pos
+    for s in substmts:
+        stmt.substmts.append(_build_stmt(s, ref, top, stmt, lazy_text))
+    return stmt
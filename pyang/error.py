@@ -413,6 +413,9 @@ error_codes = \
     'XPATH_FUNCTION':
       (2,
        'XPath function "%s" is not defined in the XPath context'),
+    'XPATH_FUNCTION_ARGS':
+      (2,
+       'XPath function "%s" cannot be called with %s arguments'),
     'AUGMENT_MANDATORY':
       (1,
        'cannot augment with mandatory node %s'),
@@ -449,9 +452,29 @@ error_codes = \
       (4,
        'line length %s exceeds %s characters'),
 
+    'XPATH_NODE_NOT_FOUND':
+      (4,
+       'node %s::%s in XPath expression is not found'),
+
     'STRICT_XPATH_FUNCTION':
       (2,
        'XPath function "%s" is not allowed for strict YANG compliance'),
+
+    'INSTANCE_SYNTAX_ERROR':
+      (1,
+       'syntax error in instance document: %s'),
+
+    'INSTANCE_UNKNOWN_NODE':
+      (2,
+       'unknown data node "%s"'),
+
+    'INSTANCE_MISSING_KEY':
+      (2,
+       'the list entry has no key "%s"'),
+
+    'INSTANCE_BAD_JSON':
+      (2,
+       'expected a JSON %s'),
     }
 
 def add_error_code(tag, level, fmt):
@@ -474,7 +497,133 @@ def err_to_str(tag, args):
     except KeyError:
         return 'unknown error %s' % tag
 
+class ErrorCollector(list):
+    """A list of errors, (Position, tag, args), with an index used to
+    find duplicate errors in constant time.
+
+    This is the class of Context.errors.  It can be used as a list, but
+    errors should be added with err_add(), which skips duplicates.
+    """
+
+    def __init__(self, errors=(), on_error=None):
+        list.__init__(self)
+        self.on_error = on_error
+        """function called with each error added to the list"""
+        self.counts = {}
+        """dict of tag:number of errors with the tag in the list"""
+        self._keys = set()
+        self._unhashable = []
+        """errors with arguments which cannot be hashed; searched linearly"""
+        self.extend(errors)
+
+    def add(self, pos, tag, args):
+        """Add an error, unless the same error is already in the list.
+
+        Returns True if the error was added.
+        """
+        key = (pos.ref, pos.line, id(pos.top), tag, args)
+        try:
+            if key in self._keys:
+                return False
+        except TypeError:
+            for (p, t, a) in self._unhashable:
+                if (p.line == pos.line and p.ref == pos.ref and
+                    p.top == pos.top and t == tag and a == args):
+                    return False
+        error = (copy.copy(pos), tag, args)
+        list.append(self, error)
+        self._index(error)
+        return True
+
+    def _index(self, error):
+        (pos, tag, args) = error
+        try:
+            self._keys.add((pos.ref, pos.line, id(pos.top), tag, args))
+        except TypeError:
+            self._unhashable.append(error)
+        self.counts[tag] = self.counts.get(tag, 0) + 1
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def _reindex(self):
+        self.counts = {}
+        self._keys = set()
+        self._unhashable = []
+        on_error = self.on_error
+        self.on_error = None
+        try:
+            for error in self:
+                self._index(error)
+        finally:
+            self.on_error = on_error
+
+    def append(self, error):
+        list.append(self, error)
+        self._index(error)
+
+    def extend(self, errors):
+        for error in errors:
+            self.append(error)
+
+    def __iadd__(self, errors):
+        self.extend(errors)
+        return self
+
+    def insert(self, i, error):
+        list.insert(self, i, error)
+        self._index(error)
+
+    # the methods below remove errors from the list, so the index is
+    # rebuilt
+
+    def remove(self, error):
+        list.remove(self, error)
+        self._reindex()
+
+    def pop(self, *args):
+        error = list.pop(self, *args)
+        self._reindex()
+        return error
+
+    def clear(self):
+        del self[:]
+
+    def __setitem__(self, i, value):
+        list.__setitem__(self, i, value)
+        self._reindex()
+
+    def __delitem__(self, i):
+        list.__delitem__(self, i)
+        self._reindex()
+
+    def __imul__(self, n):
+        list.__imul__(self, n)
+        self._reindex()
+        return self
+
+    # python 2 only
+    def __setslice__(self, i, j, value):
+        self.__setitem__(slice(i, j), value)
+
+    def __delslice__(self, i, j):
+        self.__delitem__(slice(i, j))
+
+    def __copy__(self):
+        errors = self.__class__()
+        list.extend(errors, self)
+        errors.counts = dict(self.counts)
+        errors._keys = set(self._keys)
+        errors._unhashable = list(self._unhashable)
+        errors.on_error = self.on_error
+        return errors
+
+    def __reduce__(self):
+        return (self.__class__, (list(self),))
+
 def err_add(errors, pos, tag, args):
+    if isinstance(errors, ErrorCollector):
+        errors.add(pos, tag, args)
+        return
     error = (copy.copy(pos), tag, args)
     # surely this can be done more elegant??
     for (p, t, a) in errors:
@@ -491,3 +640,30 @@ def is_error(level):
 
 def allow_warning(level):
     return level > 2
+
+def error_kind(opts, tag):
+    """Return "error" or "warning" for an error with `tag`, or None if
+    the error should not be reported, according to the command line
+    options `opts`"""
+    if tag in opts.ignore_error_tags:
+        return None
+    level = err_level(tag)
+    if is_warning(level) and tag not in opts.errors:
+        if 'error' in opts.warnings and tag not in opts.warnings:
+            return "error"
+        elif 'none' in opts.warnings:
+            return None
+        return "warning"
+    return "error"
+
+def is_implicit_error(ctx, pos, modulenames, filenames):
+    """Return True if the error at `pos` is in a module which was added
+    implicitly (by import), and should not be reported.
+
+    `modulenames` are the names of the modules given by the user and of
+    their submodules, and `filenames` the files they were read from."""
+    return (ctx.implicit_errors == False and
+            hasattr(pos.top, 'i_modulename') and
+            pos.top.arg not in modulenames and
+            pos.top.i_modulename not in modulenames and
+            pos.ref not in filenames)
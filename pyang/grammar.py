@@ -1,6 +1,5 @@
 """Description of YANG & YIN grammar."""
 
-import copy
 import re
 
 from . import util
@@ -633,7 +632,11 @@ def _chk_stmts(ctx, pos, stmts, parent, spec, canonical):
                               util.keyword_to_str(stmt.raw_keyword))
                 return
             # verify the statement's argument
-            if arg_type is None and stmt.arg is not None:
+            if (arg_type == 'string' and
+                getattr(stmt, 'lazy_arg', None) is not None):
+                # a quoted string which is parsed when it is used
+                pass
+            elif arg_type is None and stmt.arg is not None:
                 error.err_add(ctx.errors, stmt.pos,
                               'UNEXPECTED_ARGUMENT', stmt.arg)
             elif arg_type is not None and stmt.arg is None:
@@ -729,19 +732,23 @@ def _match_stmt(ctx, stmt, specs, canonical):
             while j < len(cases):
                 # check if this alternative matches - check for a
                 # match with each optional keyword
-                save_errors = copy.copy(ctx.errors)
+                save_errors = ctx.errors
+                ctx.errors = []
                 if spec == top_stmts:
                     match_res = _match_stmt(ctx, stmt, (cases[j],[]), False)
                 else:
                     match_res = _match_stmt(ctx, stmt, (cases[j],cases[j]),
                                             canonical)
+                errors = ctx.errors
+                ctx.errors = save_errors
                 if match_res != None:
                     # this case branch matched, use it.
+                    for (epos, etag, eargs) in errors:
+                        error.err_add(ctx.errors, epos, etag, eargs)
                     # remove the choice and add res to the spec.
                     nspec = spec[:i] + match_res[0] + spec[i+1:]
                     return (nspec, canspec)
                 # we must not report errors on non-matching branches
-                ctx.errors = save_errors
                 j += 1
         elif keywd == '$interleave':
             cspec = occurance
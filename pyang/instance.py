@@ -0,0 +1,537 @@
+"""Validation of instance documents against YANG modules.
+
+An `InstanceValidator` checks XML and JSON (RFC 7951) instance
+documents against a set of validated modules, without converting the
+modules to a schema first.  Each element or member is looked up in the
+schema tree, and the value of each leaf and leaf-list entry is checked
+by a function built once per leaf from the leaf's resolved `TypeSpec`.
+XML documents are parsed incrementally, so a large document is not
+kept in memory.
+
+The following is checked:
+
+  - that each node is defined in the schema
+  - that each list entry has all its keys
+  - that each value matches the type of its leaf or leaf-list
+
+Constraints between nodes (must, when, unique, mandatory, min- and
+max-elements, leafref and instance-identifier targets) are not checked.
+
+The errors are added to `ctx.errors`, with a `DataPosition` which gives
+the data path of the node, such as
+/ietf-interfaces:interfaces/interface[name='eth0']/mtu.
+"""
+
+import json
+import collections
+import xml.etree.ElementTree as ET
+
+from . import error
+from . import types
+from .error import err_add
+
+class DataPosition(error.Position):
+    """The position of a node in an instance document.
+
+    `path` is the data path of the node, and `line` is the number of
+    the node in document order, used to sort the errors."""
+    def __init__(self, ref, line, path):
+        error.Position.__init__(self, ref)
+        self.line = line
+        self.path = path
+
+    def __str__(self):
+        return self.ref + ':' + self.path
+
+class _Stop(Exception):
+    """raised when ctx.aborted is set by an error"""
+    pass
+
+_ROOT = object()
+"""schema node of the root of an instance document"""
+
+_integer_types = ('int8', 'int16', 'int32', 'int64',
+                  'uint8', 'uint16', 'uint32', 'uint64')
+
+class InstanceValidator(object):
+    """Validates instance documents against the data nodes defined in
+    `modules`, which must have been validated in `ctx`."""
+
+    def __init__(self, ctx, modules):
+        self.ctx = ctx
+        self.top = {}
+        """dict of (modulename, name):data node at the top level"""
+        for module in modules:
+            self._add_children(self.top, module.i_children)
+        self.namespaces = {}
+        """dict of module name:namespace uri"""
+        self.modulenames = {}
+        """dict of namespace uri:module name"""
+        for m in ctx.modules.values():
+            ns = m.search_one('namespace')
+            if m.keyword == 'module' and ns is not None:
+                self.namespaces[m.arg] = ns.arg
+                self.modulenames[ns.arg] = m.arg
+        self._children = {_ROOT: self.top}
+        self._tags = {}
+        """dict of schema node:dict of XML tag:child schema node"""
+        self._checkers = {}
+        self._strip = {}
+        """dict of leaf or leaf-list:True if whitespace around its XML
+        value is ignored"""
+        self._nnodes = 0
+
+    def validate_file(self, filename):
+        """Validate the instance document in `filename`; a file with the
+        suffix .json is read as JSON, and any other file as XML."""
+        try:
+            fd = open(filename, 'rb')
+        except IOError as ex:
+            err_add(self.ctx.errors, error.Position(filename), 'READ_ERROR',
+                    str(ex))
+            return
+        try:
+            if filename.endswith('.json'):
+                self.validate_json(fd, filename)
+            else:
+                self.validate_xml(fd, filename)
+        finally:
+            fd.close()
+
+    def validate_xml(self, fd, ref):
+        """Validate the XML document read from the file object `fd`.
+
+        The root element is either a top-level data node, or any other
+        element, such as <config> or <data>, with top-level data nodes
+        as children."""
+        self._nnodes = 0
+        stack = []
+        """list of [schema node, element, namespace map]; the schema
+        node is None in a subtree which is not checked"""
+        new_ns = []
+        try:
+            for (event, data) in ET.iterparse(fd, ('start', 'end',
+                                                   'start-ns')):
+                if event == 'start-ns':
+                    new_ns.append(data)
+                elif event == 'start':
+                    self._nnodes += 1
+                    if len(stack) == 0:
+                        nsmap = {}
+                        stmt = self._xml_child(_ROOT, data)
+                        if stmt is None:
+                            stmt = _ROOT
+                    else:
+                        nsmap = stack[-1][2]
+                        parent = stack[-1][0]
+                        if (parent is None or
+                            (parent is not _ROOT and
+                             parent.keyword not in ('container', 'list'))):
+                            stmt = None
+                        else:
+                            stmt = self._xml_child(parent, data)
+                            if stmt is None:
+                                self._error(stack, ref,
+                                            'INSTANCE_UNKNOWN_NODE',
+                                            self._xml_name(parent, data.tag))
+                    if len(new_ns) > 0:
+                        nsmap = dict(nsmap)
+                        nsmap.update(new_ns)
+                        new_ns = []
+                    stack.append([stmt, data, nsmap])
+                else:
+                    (stmt, elem, nsmap) = stack[-1]
+                    if stmt is None or stmt is _ROOT:
+                        pass
+                    elif stmt.keyword in ('leaf', 'leaf-list'):
+                        check = self._checker(stmt)
+                        if check is not None:
+                            s = elem.text or ''
+                            if self._strips_whitespace(stmt):
+                                s = s.strip()
+                            res = check(s, nsmap)
+                            if res is not None:
+                                self._error(stack, ref, res[0], res[1])
+                    elif stmt.keyword == 'list':
+                        for k in self._keys(stmt):
+                            if elem.find(self._xml_tag(k)) is None:
+                                self._error(stack, ref,
+                                            'INSTANCE_MISSING_KEY', k.arg)
+                    stack.pop()
+                    if (stmt is None or stmt is _ROOT or
+                        stmt.keyword not in ('leaf', 'leaf-list')):
+                        # the leafs are kept until their parent is
+                        # done, since they may be keys
+                        elem.clear()
+        except ET.ParseError as ex:
+            err_add(self.ctx.errors, DataPosition(ref, self._nnodes, '/'),
+                    'INSTANCE_SYNTAX_ERROR', str(ex))
+        except _Stop:
+            pass
+
+    def validate_json(self, fd, ref):
+        """Validate the JSON document read from the file object `fd`.
+
+        The top-level object has top-level data nodes as members, or a
+        single member, such as "ietf-restconf:data", with an object with
+        top-level data nodes as value."""
+        self._nnodes = 0
+        try:
+            s = fd.read()
+            if isinstance(s, bytes):
+                s = s.decode('utf-8')
+            # keep numbers as text, since they are checked as strings
+            doc = json.loads(s, parse_int=str, parse_float=str,
+                             object_pairs_hook=collections.OrderedDict)
+        except ValueError as ex:
+            err_add(self.ctx.errors, DataPosition(ref, 0, '/'),
+                    'INSTANCE_SYNTAX_ERROR', str(ex))
+            return
+        stack = [[_ROOT, doc]]
+        """list of [schema node, object]"""
+        if not isinstance(doc, dict):
+            self._error(stack, ref, 'INSTANCE_BAD_JSON', 'object')
+            return
+        if len(doc) == 1:
+            [(name, value)] = doc.items()
+            if (self._json_child(_ROOT, name, None) is None and
+                isinstance(value, dict)):
+                stack = [[_ROOT, value]]
+        try:
+            self._json_object(stack, ref, None)
+        except _Stop:
+            pass
+
+    def _json_object(self, stack, ref, modulename):
+        (parent, obj) = stack[-1]
+        for (name, value) in obj.items():
+            self._nnodes += 1
+            if name.startswith('@'):
+                # metadata annotations
+                continue
+            stmt = self._json_child(parent, name, modulename)
+            if stmt is None:
+                self._error(stack, ref, 'INSTANCE_UNKNOWN_NODE', name)
+                continue
+            keyword = stmt.keyword
+            if keyword == 'leaf':
+                self._json_value(stack, ref, stmt, value)
+            elif keyword == 'container':
+                stack.append([stmt, value])
+                if isinstance(value, dict):
+                    self._json_object(stack, ref, stmt.i_module.i_modulename)
+                else:
+                    self._error(stack, ref, 'INSTANCE_BAD_JSON', 'object')
+                stack.pop()
+            elif keyword == 'list':
+                if not isinstance(value, list):
+                    stack.append([stmt, {}])
+                    self._error(stack, ref, 'INSTANCE_BAD_JSON', 'array')
+                    stack.pop()
+                    continue
+                for entry in value:
+                    self._nnodes += 1
+                    stack.append([stmt, entry])
+                    if isinstance(entry, dict):
+                        for k in self._keys(stmt):
+                            if (k.arg not in entry and
+                                self._json_name(stmt, k) not in entry):
+                                self._error(stack, ref,
+                                            'INSTANCE_MISSING_KEY', k.arg)
+                        self._json_object(stack, ref,
+                                          stmt.i_module.i_modulename)
+                    else:
+                        self._error(stack, ref, 'INSTANCE_BAD_JSON', 'object')
+                    stack.pop()
+            elif keyword == 'leaf-list':
+                if not isinstance(value, list):
+                    stack.append([stmt, None])
+                    self._error(stack, ref, 'INSTANCE_BAD_JSON', 'array')
+                    stack.pop()
+                    continue
+                for v in value:
+                    self._json_value(stack, ref, stmt, v)
+
+    def _json_value(self, stack, ref, stmt, value):
+        if value is True:
+            s = 'true'
+        elif value is False:
+            s = 'false'
+        elif value == [None]:
+            # the value of a leaf of type empty
+            s = ''
+        elif isinstance(value, (list, dict)) or value is None:
+            stack.append([stmt, None])
+            self._error(stack, ref, 'INSTANCE_BAD_JSON', 'value')
+            stack.pop()
+            return
+        else:
+            s = value
+        check = self._checker(stmt)
+        if check is not None:
+            res = check(s, None)
+            if res is not None:
+                stack.append([stmt, None])
+                self._error(stack, ref, res[0], res[1])
+                stack.pop()
+
+    def _error(self, stack, ref, tag, args):
+        pos = DataPosition(ref, self._nnodes, self._path(stack))
+        err_add(self.ctx.errors, pos, tag, args)
+        if self.ctx.aborted:
+            raise _Stop
+
+    ## the schema tree
+
+    def _add_children(self, children, stmts):
+        for s in stmts:
+            if s.keyword in ('choice', 'case'):
+                self._add_children(children, s.i_children)
+            elif s.keyword in ('container', 'list', 'leaf', 'leaf-list',
+                               'anyxml', 'anydata'):
+                key = (s.i_module.i_modulename, s.arg)
+                if key not in children:
+                    children[key] = s
+
+    def _child(self, parent, modulename, name):
+        try:
+            children = self._children[parent]
+        except KeyError:
+            children = {}
+            self._add_children(children, parent.i_children)
+            self._children[parent] = children
+        return children.get((modulename, name))
+
+    def _keys(self, stmt):
+        return [k for k in getattr(stmt, 'i_key', None) or []
+                if getattr(k, 'keyword', None) == 'leaf']
+
+    def _xml_child(self, parent, elem):
+        tag = elem.tag
+        try:
+            return self._tags[parent][tag]
+        except KeyError:
+            if tag[0] != '{':
+                stmt = None
+            else:
+                (ns, name) = tag[1:].split('}', 1)
+                stmt = self._child(parent, self.modulenames.get(ns), name)
+            self._tags.setdefault(parent, {})[tag] = stmt
+            return stmt
+
+    def _xml_tag(self, stmt):
+        ns = self.namespaces.get(stmt.i_module.i_modulename, '')
+        return '{%s}%s' % (ns, stmt.arg)
+
+    def _xml_name(self, parent, tag):
+        if tag[0] == '{':
+            (ns, name) = tag[1:].split('}', 1)
+            modulename = self.modulenames.get(ns)
+            if (parent is not _ROOT and
+                parent.i_module.i_modulename == modulename):
+                return name
+            elif modulename is not None:
+                return modulename + ':' + name
+        return tag
+
+    def _json_child(self, parent, name, modulename):
+        i = name.find(':')
+        if i != -1:
+            modulename = name[:i]
+            name = name[i+1:]
+        elif modulename is None:
+            # top-level members must be qualified
+            return None
+        return self._child(parent, modulename, name)
+
+    def _json_name(self, parent, stmt):
+        modulename = stmt.i_module.i_modulename
+        if (parent is _ROOT or
+            parent.i_module.i_modulename != modulename):
+            return modulename + ':' + stmt.arg
+        return stmt.arg
+
+    def _path(self, stack):
+        """Return the data path of the last node in `stack`"""
+        s = ''
+        parent = _ROOT
+        for frame in stack:
+            (stmt, data) = (frame[0], frame[1])
+            if stmt is _ROOT:
+                continue
+            if stmt is None:
+                break
+            s += '/' + self._json_name(parent, stmt)
+            if stmt.keyword == 'list' and data is not None:
+                for k in self._keys(stmt):
+                    v = self._key_value(stmt, k, data)
+                    if v is not None:
+                        s += "[%s='%s']" % (k.arg, v)
+            parent = stmt
+        return s or '/'
+
+    def _key_value(self, stmt, key, data):
+        if isinstance(data, dict):
+            v = data.get(key.arg, data.get(self._json_name(stmt, key)))
+            if isinstance(v, (list, dict)):
+                return None
+            return v
+        elem = data.find(self._xml_tag(key))
+        if elem is None:
+            return None
+        return elem.text or ''
+
+    ## the values
+
+    def _checker(self, stmt):
+        """Return a function f(s, nsmap) which checks the value `s` of
+        the leaf or leaf-list `stmt`, or None if any value is valid.
+
+        `nsmap` is the dict of prefix:namespace uri in scope in an XML
+        document, and None in a JSON document.  The function returns
+        (tag, args) if the value is not valid, and None otherwise."""
+        try:
+            return self._checkers[stmt]
+        except KeyError:
+            type_ = stmt.search_one('type')
+            spec = getattr(type_, 'i_type_spec', None)
+            if spec is None:
+                check = None
+            else:
+                check = self._type_checker(spec, stmt)
+            self._checkers[stmt] = check
+            return check
+
+    def _strips_whitespace(self, stmt):
+        """Return True if whitespace around the XML value of the leaf or
+        leaf-list `stmt` is ignored, i.e., if no string can be a value
+        of its type."""
+        try:
+            return self._strip[stmt]
+        except KeyError:
+            type_ = stmt.search_one('type')
+            spec = getattr(type_, 'i_type_spec', None)
+            res = spec is not None and not self._has_string(spec, stmt)
+            self._strip[stmt] = res
+            return res
+
+    def _has_string(self, spec, stmt):
+        if spec.name == 'union':
+            return any(self._has_string(t.i_type_spec, stmt)
+                       for t in getattr(spec, 'types', [])
+                       if getattr(t, 'i_type_spec', None) is not None)
+        elif spec.name == 'leafref':
+            target = getattr(spec, 'i_target_node', None)
+            if target is None or target is stmt:
+                return True
+            return not self._strips_whitespace(target)
+        return spec.name == 'string'
+
+    def _type_checker(self, spec, stmt):
+        name = spec.name
+        definition = spec.definition
+        pos = stmt.pos
+        if name == 'union':
+            members = [self._type_checker(t.i_type_spec, stmt)
+                       for t in getattr(spec, 'types', [])
+                       if getattr(t, 'i_type_spec', None) is not None]
+            if None in members:
+                # some member type accepts any value
+                return None
+            def check(s, nsmap):
+                for member in members:
+                    if member(s, nsmap) is None:
+                        return None
+                return ('TYPE_VALUE',
+                        (s, definition, 'no member type matched'))
+            return check
+        elif name == 'leafref':
+            target = getattr(spec, 'i_target_node', None)
+            if target is None or target is stmt:
+                return None
+            return self._checker(target)
+        elif name == 'identityref':
+            idbases = getattr(spec, 'idbases', None)
+            if not idbases:
+                return None
+            identities = [b.i_identity for b in idbases
+                          if getattr(b, 'i_identity', None) is not None]
+            modulename = stmt.i_module.i_modulename
+            def check(s, nsmap):
+                return self._check_identityref(s, nsmap, modulename,
+                                               identities, definition)
+            return check
+        elif name == 'instance-identifier':
+            return None
+        elif name == 'empty':
+            def check(s, nsmap):
+                if s.strip() != '':
+                    return ('TYPE_VALUE', (s, definition, 'not empty'))
+                return None
+            return check
+        elif type(spec) in (types.TypeSpec, types.StringTypeSpec,
+                            types.EnumerationTypeSpec, types.BitsTypeSpec):
+            # no restrictions
+            return None
+        elif name in _integer_types:
+            def check(s, nsmap):
+                if types.re_integer_value.match(s) is None:
+                    return ('TYPE_VALUE', (s, definition, 'not an integer'))
+                errors = []
+                spec.validate(errors, pos, int(s))
+                return _first_error(errors)
+            return check
+        elif name == 'decimal64':
+            def check(s, nsmap):
+                errors = []
+                if s in ('min', 'max'):
+                    return ('TYPE_VALUE', (s, definition, 'not a decimal'))
+                val = spec.str_to_val(errors, pos, s)
+                if val is not None:
+                    spec.validate(errors, pos, val)
+                return _first_error(errors)
+            return check
+        else:
+            def check(s, nsmap):
+                errors = []
+                val = spec.str_to_val(errors, pos, s)
+                if val is not None:
+                    spec.validate(errors, pos, val)
+                return _first_error(errors)
+            return check
+
+    def _check_identityref(self, s, nsmap, modulename, identities,
+                           definition):
+        i = s.find(':')
+        if i == -1:
+            prefix = None
+            name = s
+        else:
+            prefix = s[:i]
+            name = s[i+1:]
+        if nsmap is None:
+            # JSON; the prefix is a module name
+            if prefix is not None:
+                modulename = prefix
+        else:
+            modulename = self.modulenames.get(nsmap.get(prefix or ''))
+        module = None
+        if modulename is not None:
+            module = self.ctx.get_module(modulename)
+        if module is None or name not in module.i_identities:
+            return ('TYPE_VALUE', (s, definition, 'identityref not found'))
+        val = module.i_identities[name]
+        index = self.ctx.identity_index
+        for identity in identities:
+            if not index.is_derived_from_or_self(val, identity):
+                return ('TYPE_VALUE',
+                        (s, definition,
+                         'identityref not derived from %s' % identity.arg))
+        return None
+
+def _first_error(errors):
+    if len(errors) == 0:
+        return None
+    (_pos, tag, args) = errors[0]
+    return (tag, args)
+
@@ -0,0 +1,155 @@
+"""Validation of independent modules in parallel processes.
+
+The modules given on the command line are partitioned into groups of
+modules that import or include each other, directly or through other
+given modules, or that have the same namespace.  Each group is
+validated in a process forked from the main process, and the errors
+are sent back to the main process.
+"""
+
+import sys
+import multiprocessing
+
+from . import error
+from . import util
+from . import yang_parser
+from . import yin_parser
+
+def partition(texts):
+    """Partition the modules in `texts`, a list of (filename, text), into
+    groups of modules that depend on each other, or that have the same
+    namespace.
+
+    Returns a list of lists of indices into `texts`, ordered by the
+    first index in each group.  The indices in each group are in
+    increasing order.
+    """
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        (i, j) = (find(i), find(j))
+        if i != j:
+            parent[max(i, j)] = min(i, j)
+
+    owner = {}
+    """dict of (sub)module name or namespace:index of the first file
+    which defines it"""
+    deps = []
+    for i in range(len(texts)):
+        (_filename, text) = texts[i]
+        if util.guess_format(text) == 'yin':
+            header = yin_parser.peek_header(text)
+        else:
+            header = yang_parser.peek_header(text)
+        if header is None:
+            # the dependencies are unknown; validate the module alone
+            deps.append([])
+            continue
+        names = (header.get('module', []) + header.get('submodule', []) +
+                 [('namespace', ns) for ns in header.get('namespace', [])])
+        for name in names:
+            if name in owner:
+                union(owner[name], i)
+            else:
+                owner[name] = i
+        deps.append(header.get('import', []) + header.get('include', []) +
+                    header.get('belongs-to', []))
+    for i in range(len(texts)):
+        for name in deps[i]:
+            if name in owner:
+                union(owner[name], i)
+
+    groups = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    return [groups[k] for k in sorted(groups)]
+
+def export_errors(errors):
+    """Return a copy of `errors` which can be sent to another process.
+
+    The positions in the copy have no `top` statement, and arguments
+    which are not numbers or strings are replaced by their string
+    representation, so that the same error reported by different
+    processes can be recognized.
+    """
+    return [(_export_pos(pos), tag, _export_arg(args))
+            for (pos, tag, args) in errors]
+
+def _export_pos(pos):
+    p = error.Position(pos.ref)
+    p.line = pos.line
+    if pos.uses_pos is not None:
+        p.uses_pos = _export_pos(pos.uses_pos)
+    return p
+
+def _export_arg(arg):
+    if isinstance(arg, tuple):
+        return tuple([_export_arg(a) for a in arg])
+    elif isinstance(arg, list):
+        return [_export_arg(a) for a in arg]
+    elif (arg is None or isinstance(arg, (int, float, str, type(u'')))):
+        return arg
+    else:
+        return str(arg)
+
+def import_errors(errors, exported):
+    """Add the errors in `exported`, from export_errors(), to `errors`,
+    skipping duplicates"""
+    for (pos, tag, args) in exported:
+        error.err_add(errors, pos, tag, args)
+
+_fun = None
+_items = None
+
+def _call(i):
+    return _fun(_items[i])
+
+def _get_fork_context():
+    if sys.platform == 'win32':
+        return None
+    if sys.version < '3':
+        return multiprocessing
+    try:
+        return multiprocessing.get_context('fork')
+    except ValueError:
+        return None
+
+def fork_map(fun, items, jobs, cost=None):
+    """Return [fun(item) for item in items], computed in `jobs` processes.
+
+    The processes are forked from this process, so `fun` and `items`
+    need not be picklable, but the results must be.  `cost` is an
+    optional function which estimates the time needed for an item;
+    expensive items are started first.
+
+    Returns None if processes cannot be forked on this platform.
+    """
+    global _fun, _items
+    mp = _get_fork_context()
+    if mp is None:
+        return None
+    order = list(range(len(items)))
+    if cost is not None:
+        order.sort(key=lambda i: -cost(items[i]))
+    (_fun, _items) = (fun, items)
+    try:
+        pool = mp.Pool(jobs)
+    except OSError:
+        (_fun, _items) = (None, None)
+        return None
+    try:
+        res = pool.map(_call, order, 1)
+    finally:
+        pool.close()
+        pool.join()
+        (_fun, _items) = (None, None)
+    results = [None] * len(items)
+    for (i, r) in zip(order, res):
+        results[i] = r
+    return results
@@ -26,6 +26,8 @@ class CapabilityPlugin(plugin.PyangPlugin):
             ]
         g = optparser.add_option_group("Capability output specific options")
         g.add_options(optlist)
+    def setup_fmt(self, ctx):
+        ctx.lazy_text = True
     def emit(self, ctx, modules, fd):
         for m in modules:
             emit_capability(ctx, m, fd)
@@ -53,6 +53,8 @@ class DependPlugin(plugin.PyangPlugin):
     def add_output_format(self, fmts):
         self.multiple_modules = True
         fmts['depend'] = self
+    def setup_fmt(self, ctx):
+        ctx.lazy_text = True
     def emit(self, ctx, modules, fd):
         # cannot do this unless everything is ok for our module
         modulenames = [m.arg for m in modules]
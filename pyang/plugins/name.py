@@ -14,6 +14,7 @@ class NamePlugin(plugin.PyangPlugin):
 
     def setup_fmt(self, ctx):
         ctx.implicit_errors = False
+        ctx.lazy_text = True
 
     def emit(self, ctx, modules, fd):
         emit_name(ctx, modules, fd)
@@ -46,6 +46,7 @@ class TreePlugin(plugin.PyangPlugin):
 
     def setup_fmt(self, ctx):
         ctx.implicit_errors = False
+        ctx.lazy_text = True
 
     def emit(self, ctx, modules, fd):
         if ctx.opts.tree_path is not None:
@@ -0,0 +1,398 @@
+"""A server which validates and converts modules on request.
+
+The server reads JSON-RPC 2.0 requests, one per line, from stdin or
+from clients connected to a Unix socket, and writes one response per
+line.  The methods are:
+
+  validate   params: {"files": [filename, ...]}
+  convert    params: {"files": [filename, ...], "format": format,
+                      "output": filename}
+  shutdown   no params
+
+"output" is optional.  The result of validate and convert is an object
+with the members "exit_code", the exit code pyang would have given,
+and "errors", a list of objects with the members "position", "ref",
+"line", "kind" ("error" or "warning"), "tag" and "message".  If pyang
+would have given some other message, e.g. when a plugin fails to emit
+its output, it is in the member "message".  The result of convert has
+the converted text in the member "output", unless "output" is given in
+the request.
+
+The server keeps the repository, and a cache of parsed modules, in
+memory between requests.  The modules imported by the requested
+modules are validated once, and kept as a snapshot (see
+`pyang.snapshot`).  The snapshot is reused as long as none of its
+module files have been modified, and no modules have been added to or
+removed from the search path.
+"""
+
+import sys
+import os
+import io
+import stat
+import json
+import socket
+import collections
+if sys.version < '3':
+    import codecs
+
+from . import Context
+from . import add_files
+from . import validate_modules
+from . import sort_errors
+from . import plugin
+from . import error
+from . import cache
+from . import snapshot
+
+_session_attrs = ('modules', 'revs', 'errors', 'deviation_modules',
+                  'repository', 'identity_index')
+"""Context attributes which are not copied from the template context"""
+
+class _InvalidParams(Exception):
+    pass
+
+class Server(object):
+    def __init__(self, ctx, fmts, max_snapshots=16):
+        """`ctx` is a Context set up with the command line options and
+        the plugins' setup_ctx(), which is used as a template for the
+        context of each request.
+        `fmts` is the dict of output formats."""
+        self.template = ctx
+        self.fmts = fmts
+        self.repository = ctx.repository
+        if ctx.parse_cache is None:
+            ctx.parse_cache = cache.MemoryParseCache()
+        self.snapshots = collections.OrderedDict()
+        """dict of (keep_comments, imported module names):snapshot data,
+        least recently used first"""
+        self.max_snapshots = max_snapshots
+        self.repos_modules = None
+        """the modules found in the repository when the snapshots were
+        made"""
+        self.done = False
+        self.methods = {'validate': self.validate,
+                        'convert': self.convert,
+                        'shutdown': self.shutdown}
+
+    def serve(self, socket_path=None):
+        """Serve requests on stdin, or on the Unix socket `socket_path`,
+        until a shutdown request is received"""
+        if socket_path is None:
+            if sys.version < '3':
+                (rfd, wfd) = (sys.stdin, sys.stdout)
+            else:
+                (rfd, wfd) = (sys.stdin.buffer, sys.stdout.buffer)
+            # keep stray output from plugins out of the responses
+            stdout = sys.stdout
+            sys.stdout = sys.stderr
+            try:
+                self._serve_stream(rfd, wfd)
+            finally:
+                sys.stdout = stdout
+            return
+        try:
+            if stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                # left behind by a server which was killed
+                os.remove(socket_path)
+        except OSError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(socket_path)
+            sock.listen(5)
+            if self.template.opts.verbose:
+                sys.stderr.write("listening on %s\n" % socket_path)
+            while not self.done:
+                (conn, _addr) = sock.accept()
+                rfd = conn.makefile('rb')
+                wfd = conn.makefile('wb')
+                try:
+                    self._serve_stream(rfd, wfd)
+                except socket.error:
+                    # the client went away
+                    pass
+                rfd.close()
+                try:
+                    wfd.close()
+                except socket.error:
+                    pass
+                conn.close()
+        finally:
+            sock.close()
+            try:
+                os.remove(socket_path)
+            except OSError:
+                pass
+
+    def _serve_stream(self, rfd, wfd):
+        while not self.done:
+            line = rfd.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                response = self.handle(line.decode('utf-8'))
+            except UnicodeDecodeError:
+                response = self._error(None, -32700, "parse error")
+            if response is not None:
+                wfd.write(response.encode('utf-8') + b'\n')
+                wfd.flush()
+
+    def handle(self, line):
+        """Handle the JSON-RPC request in `line`.
+
+        Returns the response, or None if the request is a notification.
+        """
+        try:
+            req = json.loads(line)
+        except ValueError:
+            return self._error(None, -32700, "parse error")
+        if not isinstance(req, dict) or 'method' not in req:
+            return self._error(None, -32600, "invalid request")
+        rid = req.get('id')
+        method = req['method']
+        params = req.get('params')
+        if params is None:
+            params = {}
+        if method not in self.methods:
+            return self._error(rid, -32601, "method not found")
+        if not isinstance(params, dict):
+            return self._error(rid, -32602, "params must be an object")
+        try:
+            result = self.methods[method](params)
+        except _InvalidParams as ex:
+            return self._error(rid, -32602, str(ex))
+        except Exception as ex:
+            return self._error(rid, -32603, "internal error: %r" % ex)
+        if 'id' not in req:
+            return None
+        return json.dumps({'jsonrpc': '2.0', 'id': rid, 'result': result},
+                          sort_keys=True)
+
+    def _error(self, rid, code, msg):
+        return json.dumps({'jsonrpc': '2.0', 'id': rid,
+                           'error': {'code': code, 'message': msg}},
+                          sort_keys=True)
+
+    def validate(self, params):
+        return self._run(self._get_files(params), None, None)
+
+    def convert(self, params):
+        format = params.get('format')
+        if format not in self.fmts:
+            raise _InvalidParams("unsupported format '%s'" % format)
+        return self._run(self._get_files(params), self.fmts[format],
+                         params.get('output'))
+
+    def shutdown(self, params):
+        self.done = True
+        return None
+
+    def _get_files(self, params):
+        files = params.get('files')
+        if not isinstance(files, list) or len(files) == 0:
+            raise _InvalidParams("files must be a non-empty list")
+        return files
+
+    def new_context(self):
+        """Return a new Context with the settings of the template"""
+        ctx = Context(self.repository)
+        for (k, v) in self.template.__dict__.items():
+            if k not in _session_attrs:
+                setattr(ctx, k, v)
+        return ctx
+
+    def _refresh(self):
+        """Find modules added to or removed from the repository"""
+        self.repository.refresh()
+        modules = self.repository.get_modules_and_revisions(None)
+        if modules != self.repos_modules:
+            # a module imported by a snapshot may have been replaced
+            self.snapshots.clear()
+            self.repos_modules = modules
+
+    def _run(self, filenames, emit_obj, outfile):
+        self._refresh()
+        ctx = self.new_context()
+        o = ctx.opts
+        if emit_obj is not None:
+            if o.keep_comments and emit_obj.handle_comments:
+                ctx.keep_comments = True
+            emit_obj.setup_fmt(ctx)
+            if len(filenames) > 1 and not emit_obj.multiple_modules:
+                raise _InvalidParams("too many files to convert")
+
+        for p in plugin.plugins:
+            p.pre_load_modules(ctx)
+
+        texts = [(filename, self._read(filename)) for filename in filenames]
+        self._load_imports(ctx, texts)
+
+        (modules, ok) = add_files(ctx, texts)
+        exit_code = 0 if ok else 1
+        deviations = [(filename, self._read(filename))
+                      for filename in o.deviations]
+        (modulenames, msg) = validate_modules(ctx, modules, deviations,
+                                              emit_obj)
+        if msg is not None:
+            return {'exit_code': 1, 'errors': [], 'message': msg}
+
+        (exit_code, errors) = self._report(ctx, filenames, modulenames,
+                                           exit_code)
+        result = {'exit_code': exit_code, 'errors': errors}
+        if emit_obj is not None and len(modules) > 0:
+            self._emit(ctx, emit_obj, modules, outfile, result)
+        return result
+
+    def _read(self, filename):
+        try:
+            fd = io.open(filename, "r", encoding="utf-8")
+            try:
+                return fd.read()
+            finally:
+                fd.close()
+        except IOError as ex:
+            raise _InvalidParams("error %s: %s" % (filename, str(ex)))
+        except UnicodeDecodeError as ex:
+            s = str(ex).replace('utf-8', 'utf8')
+            raise _InvalidParams("%s: unicode error: %s" % (filename, s))
+
+    def _load_imports(self, ctx, texts):
+        """Load the modules imported by the modules in `texts` into `ctx`,
+        from a snapshot which is made if needed"""
+        imports = self._get_imports(ctx, [(text, None)
+                                          for (_filename, text) in texts])
+        if not imports:
+            return
+        key = (ctx.keep_comments, tuple(sorted(imports)))
+        data = self.snapshots.pop(key, None)
+        if data is not None and snapshot.load(ctx, io.BytesIO(data)):
+            self.snapshots[key] = data
+            return
+        # no snapshot, or one of its modules has been modified
+        data = self._make_snapshot(imports, ctx.keep_comments)
+        if data is None:
+            return
+        self.snapshots[key] = data
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+        snapshot.load(ctx, io.BytesIO(data))
+
+    def _get_imports(self, ctx, texts):
+        """Return the names of the modules imported by the modules in
+        `texts`, a list of (text, format), and by the submodules they
+        include.
+
+        Returns None if the imports cannot be found by scanning the
+        module headers, or if a specific revision is imported; the
+        modules must then be validated without a snapshot.
+        """
+        imports = set()
+        names = set()
+        included = set()
+        while len(texts) > 0:
+            (text, format) = texts.pop()
+            header = self.repository.peek_header(text, format)
+            if (header is None or 'import-revision-date' in header or
+                'include-revision-date' in header):
+                return None
+            names.update(header.get('module', []))
+            names.update(header.get('submodule', []))
+            imports.update(header.get('import', []))
+            for name in header.get('include', []):
+                if name in included:
+                    continue
+                included.add(name)
+                r = self._read_module(ctx, name)
+                if r is not None:
+                    texts.append(r)
+        return imports - names
+
+    def _read_module(self, ctx, modulename):
+        """Return the (text, format) of the latest revision of
+        `modulename` in the repository, or None"""
+        if modulename not in ctx.revs:
+            return None
+        try:
+            (_rev, handle) = ctx._get_latest_rev(ctx.revs[modulename])
+            if handle is None or handle[0] == 'parsed':
+                return None
+            (_ref, format, text) = \
+                self.repository.get_module_from_handle(handle)
+        except self.repository.ReadError:
+            return None
+        return (text, format)
+
+    def _make_snapshot(self, modulenames, keep_comments):
+        """Validate the modules in `modulenames` in a new context, and
+        return a snapshot of the context"""
+        ctx = self.new_context()
+        ctx.keep_comments = keep_comments
+        pos = error.Position('<server>')
+        for modulename in sorted(modulenames):
+            if ctx.search_module(pos, modulename) is None:
+                # the error must be reported where the module is imported
+                return None
+        fd = io.BytesIO()
+        try:
+            snapshot.save(ctx, fd)
+        except Exception:
+            # something in the modules cannot be pickled
+            return None
+        return fd.getvalue()
+
+    def _report(self, ctx, filenames, modulenames, exit_code):
+        """Return the exit code and the errors to report, like pyang
+        reports them on stderr"""
+        o = ctx.opts
+        sort_errors(ctx, filenames)
+        errors = []
+        for (epos, etag, eargs) in ctx.errors:
+            kind = error.error_kind(o, etag)
+            if kind is None:
+                continue
+            if error.is_implicit_error(ctx, epos, modulenames, filenames):
+                continue
+            if kind == "error":
+                exit_code = 1
+            errors.append({'position': str(epos),
+                           'ref': epos.ref,
+                           'line': epos.line,
+                           'kind': kind,
+                           'tag': etag,
+                           'message': error.err_to_str(etag, eargs)})
+        return (exit_code, errors)
+
+    def _emit(self, ctx, emit_obj, modules, outfile, result):
+        tmpfile = None
+        if outfile is None:
+            buf = io.BytesIO()
+            if sys.version < '3':
+                fd = codecs.getwriter('utf8')(buf)
+            else:
+                fd = io.TextIOWrapper(buf, encoding="utf-8")
+        else:
+            tmpfile = outfile + ".tmp"
+            if sys.version < '3':
+                fd = codecs.open(tmpfile, "w+", encoding="utf-8")
+            else:
+                fd = io.open(tmpfile, "w+", encoding="utf-8")
+        try:
+            emit_obj.emit(ctx, modules, fd)
+        except error.EmitError as e:
+            result['exit_code'] = e.exit_code
+            if e.msg != "":
+                result['message'] = e.msg
+            if tmpfile is not None:
+                fd.close()
+                os.remove(tmpfile)
+            return
+        fd.flush()
+        if tmpfile is None:
+            result['output'] = buf.getvalue().decode('utf-8')
+        else:
+            fd.close()
+            os.rename(tmpfile, outfile)
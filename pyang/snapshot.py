@@ -0,0 +1,113 @@
+"""Snapshots of validated modules.
+
+A snapshot holds the modules in a context after validation, i.e. with
+all groupings expanded and all types, identities and references
+resolved, together with the errors found while validating them.  A
+snapshot of a set of base modules can be loaded into a new context
+before other modules are added; modules that import the base modules
+are then validated without validating the base modules again.
+
+A snapshot is only loaded if it was made by the same version of pyang,
+with the same validation options and validation functions, and if
+none of the module files have been modified since.
+"""
+
+import os
+import sys
+import hashlib
+import pickle
+
+from . import statements
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, fd, ctx):
+        pickle.Pickler.__init__(self, fd, 2)
+        self.ctx = ctx
+
+    def persistent_id(self, obj):
+        if obj is self.ctx:
+            return 'ctx'
+        return None
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, fd, ctx):
+        pickle.Unpickler.__init__(self, fd)
+        self.ctx = ctx
+
+    def persistent_load(self, pid):
+        if pid == 'ctx':
+            return self.ctx
+        raise pickle.UnpicklingError('unknown persistent id %s' % pid)
+
+def fingerprint(ctx):
+    """Return a string which identifies the version of pyang and the
+    options that affect the validation of modules in `ctx`"""
+    from . import __version__
+    keys = sorted([repr(k) for k in statements._validation_map])
+    features = sorted([(m, sorted(fs)) for (m, fs) in ctx.features.items()])
+    deviations = []
+    if getattr(ctx, 'opts', None) is not None:
+        deviations = getattr(ctx.opts, 'deviations', [])
+    s = repr((__version__, sys.version_info[:2],
+              ctx.strict, ctx.canonical, ctx.max_line_len,
+              ctx.max_identifier_len, ctx.lax_xpath_checks,
+              ctx.keep_comments, getattr(ctx, 'trim_yin', False),
+              features, deviations, statements._validation_phases, keys))
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+def _file_info(ref):
+    try:
+        st = os.stat(ref)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size)
+
+def save(ctx, fd):
+    """Write a snapshot of all modules in `ctx` to the binary file `fd`."""
+    files = {}
+    for m in ctx.modules.values():
+        if m is not None:
+            files[m.pos.ref] = _file_info(m.pos.ref)
+    limit = sys.getrecursionlimit()
+    # the statement trees are deeply linked, and pickle recurses
+    sys.setrecursionlimit(max(limit, 20000))
+    try:
+        pickle.dump((fingerprint(ctx), files), fd, 2)
+        _Pickler(fd, ctx).dump((ctx.modules, list(ctx.errors)))
+    finally:
+        sys.setrecursionlimit(limit)
+
+def load(ctx, fd):
+    """Add the modules in the snapshot in the binary file `fd` to `ctx`.
+
+    The snapshot must be loaded before any modules are added to `ctx`.
+    Returns True if the snapshot was loaded, and False if the snapshot
+    could not be used.
+    """
+    try:
+        (fp, files) = pickle.load(fd)
+    except Exception:
+        return False
+    if fp != fingerprint(ctx):
+        return False
+    for ref in files:
+        if _file_info(ref) != files[ref]:
+            return False
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 20000))
+    try:
+        (modules, errors) = _Unpickler(fd, ctx).load()
+    except Exception:
+        return False
+    finally:
+        sys.setrecursionlimit(limit)
+    for (name, rev) in modules:
+        if (name, rev) in ctx.modules:
+            continue
+        ctx.modules[(name, rev)] = modules[(name, rev)]
+        ctx.identity_index.add_module(modules[(name, rev)])
+        if name not in ctx.revs:
+            ctx.revs[name] = [(rev, None)]
+    for e in errors:
+        ctx.errors.append(e)
+    return True
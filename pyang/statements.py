@@ -1,5 +1,6 @@
 import copy
 import re
+import time
 
 from . import util
 from .util import attrsearch, keysearch, prefix_to_module, \
@@ -37,10 +38,11 @@ def add_validation_fun(phase, keywords, f):
     for keyword in keywords:
         if (phase, keyword) in _validation_map:
             oldf = _validation_map[(phase, keyword)]
-            def newf(ctx, s):
-                oldf(ctx, s)
-                f(ctx, s)
-            _validation_map[(phase, keyword)] = newf
+            if isinstance(oldf, _ChainedFun):
+                funs = oldf.funs + [f]
+            else:
+                funs = [oldf, f]
+            _validation_map[(phase, keyword)] = _ChainedFun(funs)
         else:
             _validation_map[(phase, keyword)] = f
 
@@ -132,6 +134,17 @@ extra_xpath_functions = [
     'deref', # pyang extension for 1.0
     ]
 
+yang_xpath_function_arity = {
+    'current': (0, 0),
+    'bit-is-set': (2, 2),
+    'enum-value': (1, 1),
+    'deref': (1, 1),
+    'derived-from': (2, 2),
+    'derived-from-or-self': (2, 2),
+    're-match': (2, 2),
+    }
+"""dict of function name:(min number of args, max number of args or None)"""
+
 data_definition_keywords = ['container', 'leaf', 'leaf-list', 'list',
                             'choice', 'anyxml', 'anydata', 'uses', 'augment']
 
@@ -217,6 +230,8 @@ _validation_map = {
     ('type', 'base'):lambda ctx, s: v_type_base(ctx, s),
     ('type', '$extension'): lambda ctx, s: v_type_extension(ctx, s),
 
+    ('type_2', 'module'):lambda ctx, s: v_type_2_module(ctx, s),
+    ('type_2', 'submodule'):lambda ctx, s: v_type_2_module(ctx, s),
     ('type_2', 'type'):lambda ctx, s: v_type_type(ctx, s),
     ('type_2', 'typedef'):lambda ctx, s: v_type_typedef(ctx, s),
     ('type_2', 'leaf'):lambda ctx, s: v_type_leaf(ctx, s),
@@ -244,6 +259,8 @@ _validation_map = {
     ('reference_1', 'choice'):lambda ctx, s: v_reference_choice(ctx, s),
     ('reference_2', 'leaf'):lambda ctx, s:v_reference_leaf_leafref(ctx, s),
     ('reference_2', 'leaf-list'):lambda ctx, s:v_reference_leaf_leafref(ctx, s),
+    ('reference_2', 'must'):lambda ctx, s:v_reference_xpath_nodes(ctx, s),
+    ('reference_2', 'when'):lambda ctx, s:v_reference_xpath_nodes(ctx, s),
     ('reference_3', 'typedef'):lambda ctx, s:v_reference_leaf_leafref(ctx, s),
     ('reference_3', 'must'):lambda ctx, s:v_reference_must(ctx, s),
     ('reference_3', 'when'):lambda ctx, s:v_reference_when(ctx, s),
@@ -272,6 +289,8 @@ _v_i_children = {
 Note that the tests are not run in grouping definitions."""
 
 _v_i_children_keywords = {
+    ('reference_2', 'must'):True,
+    ('reference_2', 'when'):True,
 }
 """Keywords in this dict are iterated over in a phase in _v_i_children."""
 
@@ -304,6 +323,12 @@ _keywords_with_no_explicit_config = ['action', 'rpc', 'notification']
 
 _copy_uses_keywords = []
 
+_uses_nocopy_keywords = ['type', 'uses', 'unique', 'typedef', 'grouping',
+                         'description', 'reference']
+"""statements which are shared between a grouping and its expansions.
+They are never modified in place; a refine or deviation which changes
+them replaces the statement in the expanded node's substmts."""
+
 _copy_augment_keywords = []
 
 _refinements = [
@@ -356,12 +381,33 @@ _valid_deviations = {
     'unique':['list'],
 }
 
+class _ChainedFun(object):
+    """Several validation functions added for the same phase and keyword
+    with add_validation_fun().  They are called in order, and their
+    results are ignored."""
+
+    def __init__(self, funs):
+        self.funs = funs
+
+    def __call__(self, ctx, stmt):
+        for f in self.funs:
+            f(ctx, stmt)
+
 ### Validation
 
 def validate_module(ctx, module):
     """Validate `module`, which is a Statement representing a (sub)module"""
 
+    profile = ctx.validation_profile
+    if profile is None:
+        validation_map = _validation_map
+    else:
+        validation_map = profile.wrap_validation_map(module, _validation_map)
+    visited = [0]
+
     def iterate(stmt, phase):
+        if profile is not None:
+            visited[0] += 1
         # if the grammar is not yet checked or if it is checked and
         # valid, then we continue.
         if (hasattr(stmt, 'is_grammatically_valid') and
@@ -370,23 +416,23 @@ def validate_module(ctx, module):
         # first check an exact match
         key = (phase, stmt.keyword)
         res = 'recurse'
-        if key in _validation_map:
-            f = _validation_map[key]
+        if key in validation_map:
+            f = validation_map[key]
             res = f(ctx, stmt)
             if res == 'stop':
                 raise Abort
         # then also run match by special variable
         for (var_name, var_f) in _validation_variables:
             key = (phase, var_name)
-            if key in _validation_map and var_f(stmt.keyword) == True:
-                f = _validation_map[key]
+            if key in validation_map and var_f(stmt.keyword) == True:
+                f = validation_map[key]
                 res = f(ctx, stmt)
                 if res == 'stop':
                     raise Abort
         # then run wildcard
         wildcard = (phase, '*')
-        if wildcard in _validation_map:
-            f = _validation_map[wildcard]
+        if wildcard in validation_map:
+            f = validation_map[wildcard]
             res = f(ctx, stmt)
             if res == 'stop':
                 raise Abort
@@ -415,11 +461,143 @@ def validate_module(ctx, module):
     module.i_is_validated = 'in_progress'
     try:
         for phase in _validation_phases:
-            iterate(module, phase)
+            if ctx.aborted:
+                raise Abort
+            if profile is None:
+                iterate(module, phase)
+            else:
+                visited[0] = 0
+                start = profile.start()
+                try:
+                    iterate(module, phase)
+                finally:
+                    profile.stop_phase(start, module, phase, visited[0])
     except Abort:
         pass
     module.i_is_validated = True
 
+class ValidationProfile(object):
+    """Records the time spent in each validation phase and function.
+
+    Set `ctx.validation_profile` to an instance of this class before
+    the modules are validated.  The time of a function or phase is
+    recorded both in total and without the time of the nested calls,
+    e.g. the validation of an imported module in the import phase."""
+
+    def __init__(self):
+        self.funs = {}
+        """dict of (modulename, phase, keyword, function name):
+        [calls, time, self time]"""
+        self.phases = {}
+        """dict of (modulename, phase):[statements visited, time, self time]"""
+        self._nested = []
+        """the time spent in nested calls, for each active call"""
+
+    def start(self):
+        self._nested.append(0.0)
+        return time.time()
+
+    def stop(self, start, rec):
+        t = time.time() - start
+        nested = self._nested.pop()
+        if len(self._nested) > 0:
+            self._nested[-1] += t
+        rec[1] += t
+        rec[2] += t - nested
+
+    def stop_phase(self, start, module, phase, visited):
+        key = (module.arg, phase)
+        if key not in self.phases:
+            self.phases[key] = [0, 0.0, 0.0]
+        rec = self.phases[key]
+        rec[0] += visited
+        self.stop(start, rec)
+
+    def wrap_validation_map(self, module, validation_map):
+        """Return a copy of `validation_map` where each function records
+        its calls in the receiver"""
+        res = {}
+        for ((phase, keyword), f) in validation_map.items():
+            if isinstance(f, _ChainedFun):
+                funs = f.funs
+            else:
+                funs = [f]
+            timed = [self._timed(module, phase, keyword, g) for g in funs]
+            if len(timed) == 1:
+                res[(phase, keyword)] = timed[0]
+            else:
+                res[(phase, keyword)] = _ChainedFun(timed)
+        return res
+
+    def _timed(self, module, phase, keyword, f):
+        key = (module.arg, phase, util.keyword_to_str(keyword), _fun_name(f))
+        if key not in self.funs:
+            self.funs[key] = [0, 0.0, 0.0]
+        rec = self.funs[key]
+        def timed(ctx, stmt):
+            rec[0] += 1
+            start = self.start()
+            try:
+                return f(ctx, stmt)
+            finally:
+                self.stop(start, rec)
+        return timed
+
+    def as_json(self):
+        """Return the recorded data as a JSON serializable object"""
+        funs = [{'module': m, 'phase': p, 'keyword': k, 'function': f,
+                 'calls': calls, 'time': t, 'self-time': selft}
+                for ((m, p, k, f), (calls, t, selft))
+                in self.funs.items()
+                if calls > 0]
+        funs.sort(key=lambda x: -x['self-time'])
+        phases = [{'module': m, 'phase': p, 'statements': n,
+                   'time': t, 'self-time': selft}
+                  for ((m, p), (n, t, selft)) in self.phases.items()]
+        phases.sort(key=lambda x: -x['self-time'])
+        return {'functions': funs, 'phases': phases}
+
+    def print_table(self, fd):
+        """Print the recorded data as two tables, sorted on self time"""
+        data = self.as_json()
+        rows = [('self', 'total', 'calls', 'module', 'phase', 'keyword',
+                 'function')]
+        for x in data['functions']:
+            rows.append(('%.4f' % x['self-time'], '%.4f' % x['time'],
+                         str(x['calls']), x['module'], x['phase'],
+                         x['keyword'], x['function']))
+        _print_table(fd, rows)
+        fd.write('\n')
+        rows = [('self', 'total', 'statements', 'module', 'phase')]
+        for x in data['phases']:
+            rows.append(('%.4f' % x['self-time'], '%.4f' % x['time'],
+                         str(x['statements']), x['module'], x['phase']))
+        _print_table(fd, rows)
+
+def _print_table(fd, rows):
+    # right-align the numbers in the first three columns
+    widths = [max([len(row[i]) for row in rows])
+              for i in range(len(rows[0]))]
+    for row in rows:
+        cols = [col.rjust(w) if i < 3 else col.ljust(w)
+                for (i, (col, w)) in enumerate(zip(row, widths))]
+        fd.write('  '.join(cols).rstrip() + '\n')
+
+def _fun_name(f):
+    """Return a name for the validation function `f`"""
+    name = getattr(f, '__name__', None)
+    if name is None:
+        name = f.__class__.__name__
+    code = getattr(f, '__code__', None)
+    if name == '<lambda>' and code is not None and len(code.co_names) > 0:
+        # most validation functions are lambdas which call a function
+        if callable(f.__globals__.get(code.co_names[0])):
+            name = code.co_names[0]
+    modname = getattr(f, '__module__', None)
+    if modname is not None:
+        name = modname + '.' + name
+    return name
+
 def v_init_module(ctx, stmt):
     ## remember that the grammar is not validated
     vsn = stmt.search_one('yang-version')
@@ -484,6 +662,8 @@ def v_init_module(ctx, stmt):
     stmt.i_ctx = ctx
     # keep track of created augment nodes
     stmt.i_undefined_augment_nodes = {}
+    # cache of the data node children used in xpath expressions
+    stmt.i_xpath_children = {}
     # next, set the attribute 'i_module' in each statement to point to the
     # module where the statement is defined.  if the module is a submodule,
     # 'i_module' will point to the main module.
@@ -501,6 +681,7 @@ def v_init_extension(ctx, stmt):
         prefix_to_modulename_and_revision(stmt.i_module, prefix,
                                           stmt.pos, ctx.errors)
     stmt.keyword = (modname, identifier)
+    stmt_changed(stmt)
     stmt.i_extension_modulename = modname
     stmt.i_extension_revision = revision
     stmt.i_extension = None
@@ -511,7 +692,7 @@ def v_init_stmt(ctx, stmt):
     stmt.i_uniques = []
 
 def v_init_has_children(ctx, stmt):
-    stmt.i_children = []
+    stmt.i_children = StmtList()
 
 def v_init_import(ctx, stmt):
     stmt.i_is_safe_import = False
@@ -662,6 +843,10 @@ def v_import_module(ctx, stmt):
 
 ### type phase
 
+def v_type_2_module(ctx, stmt):
+    # the bases of all identities are resolved in the type phase
+    ctx.identity_index.add_module(stmt)
+
 def v_type_typedef(ctx, stmt):
     if hasattr(stmt, 'i_is_validated'):
         if stmt.i_is_validated == True:
@@ -1336,7 +1521,7 @@ def v_expand_1_children(ctx, stmt):
             # create the implicitly defined input node
             input_ = Statement(stmt.top, stmt, stmt.pos, 'input', 'input')
             v_init_stmt(ctx, input_)
-            input_.i_children = []
+            input_.i_children = StmtList()
             input_.i_module = stmt.i_module
             stmt.i_children.append(input_)
         else:
@@ -1353,7 +1538,7 @@ def v_expand_1_children(ctx, stmt):
             # create the implicitly defined output node
             output = Statement(stmt.top, stmt, stmt.pos, 'output', 'output')
             v_init_stmt(ctx, output)
-            output.i_children = []
+            output.i_children = StmtList()
             output.i_module = stmt.i_module
             stmt.i_children.append(output)
         else:
@@ -1488,26 +1673,28 @@ def v_expand_1_uses(ctx, stmt):
         def post_copy(old, new):
             # inline the definition into our module
             new.i_module = stmt.i_module
-            new.i_children = []
+            new.i_children = StmtList()
             new.i_uniques = []
             new.pos.uses_pos = stmt.pos
             # build the i_children list of pointers
             if hasattr(old, 'i_children'):
+                substmt_idx = {}
+                for (idx, x) in enumerate(old.substmts):
+                    substmt_idx.setdefault(id(x), idx)
                 for x in old.i_children:
                     # check if this i_child is a pointer to a substmt
-                    if x in old.substmts:
+                    idx = substmt_idx.get(id(x))
+                    if idx is not None:
                         # if so, create an equivalent pointer
-                        idx = old.substmts.index(x)
                         new.i_children.append(new.substmts[idx])
                     else:
                         # otherwise, copy the i_child
                         newx = x.copy(new, stmt,
-                                      nocopy=['type','uses', 'unique',
-                                              'typedef','grouping'],
+                                      nocopy=_uses_nocopy_keywords,
                                       copyf=post_copy)
                         new.i_children.append(newx)
         newg = g.copy(stmt.parent, stmt,
-                      nocopy=['type','uses','unique','typedef','grouping'],
+                      nocopy=_uses_nocopy_keywords,
                       copyf=post_copy)
         stmt.parent.i_children.append(newg)
 
@@ -1717,7 +1904,7 @@ def create_new_case(ctx, choice, child, expand=True):
     new_case = Statement(child.top, child.parent, child.pos, 'case', child.arg)
     v_init_stmt(ctx, new_case)
     new_child = child.copy(new_case)
-    new_case.i_children = [new_child]
+    new_case.i_children = StmtList([new_child])
     new_case.i_module = child.i_module
     choice.i_children.append(new_case)
     if expand:
@@ -1970,7 +2157,7 @@ def v_reference_must(ctx, stmt):
 
 def v_xpath(ctx, stmt):
     try:
-        toks = xpath.tokens(stmt.arg)
+        toks = xpath.compile(stmt.arg)
         for (tokname, s) in toks:
             if tokname == 'name' or tokname == 'prefix-match':
                 i = s.find(':')
@@ -2007,13 +2194,246 @@ def v_xpath(ctx, stmt):
                          s in yang_1_1_xpath_functions) or
                         s in extra_xpath_functions):
                     err_add(ctx.errors, stmt.pos, 'XPATH_FUNCTION', s)
+        # the tokens are correct, now check the grammar
+        tree = xpath.parse(stmt.arg)
+        if ctx.lax_xpath_checks != True:
+            chk_xpath_function_args(ctx, stmt, tree)
 
     except SyntaxError as e:
         err_add(ctx.errors, stmt.pos, 'XPATH_SYNTAX_ERROR', e)
 
+def chk_xpath_function_args(ctx, stmt, e):
+    """Check the number of arguments in all calls to known functions in
+    the XPath syntax tree `e`"""
+    if e[0] == 'function':
+        (_, name, args) = e
+        arity = xpath.core_function_arity.get(name)
+        if arity is None:
+            arity = yang_xpath_function_arity.get(name)
+        if arity is not None:
+            (min_args, max_args) = arity
+            if (len(args) < min_args or
+                (max_args is not None and len(args) > max_args)):
+                err_add(ctx.errors, stmt.pos, 'XPATH_FUNCTION_ARGS',
+                        (name, len(args)))
+    for sub in _xpath_subexprs(e):
+        chk_xpath_function_args(ctx, stmt, sub)
+
+def _xpath_subexprs(e):
+    if e[0] == 'path':
+        steps = e[2]
+    elif e[0] == 'filter':
+        steps = e[3]
+        yield e[1]
+        for p in e[2]:
+            yield p
+    else:
+        if e[0] == 'binary':
+            yield e[2]
+            yield e[3]
+        elif e[0] == 'negative':
+            yield e[1]
+        elif e[0] == 'function':
+            for a in e[2]:
+                yield a
+        return
+    for (_axis, _nodetest, preds) in steps:
+        for p in preds:
+            yield p
+
 def v_reference_when(ctx, stmt):
     v_xpath(ctx, stmt)
 
+_xpath_root = object()
+"""the root node in the node sets used by v_reference_xpath_nodes()"""
+
+_xpath_data_parents = ['container', 'list', 'leaf', 'leaf-list',
+                       'anyxml', 'anydata']
+
+def v_reference_xpath_nodes(ctx, stmt):
+    """Verify that the nodes in a must or when expression are found in
+    the expanded schema tree.
+
+    Only child steps by name, '.', '..' and current() are followed;
+    any other step makes the rest of the path unknown, and is not
+    checked.
+    """
+    if ctx.lax_xpath_checks == True:
+        return
+    node = xpath_context_node(stmt)
+    if node is None:
+        return
+    try:
+        tree = xpath.parse(stmt.arg)
+    except SyntaxError:
+        # reported by v_xpath
+        return
+    _xpath_eval(ctx, stmt, node, tree, [node])
+
+def xpath_context_node(stmt):
+    """Return the context node of the must or when expression in `stmt`,
+    or None if it is not known"""
+    p = stmt.parent
+    if stmt.keyword == 'must':
+        if p.keyword in _xpath_data_parents or \
+           p.keyword in ('input', 'output', 'notification'):
+            return p
+        return None
+    if p.keyword == 'augment':
+        p = getattr(p, 'i_target_node', None)
+        if p is None:
+            return None
+    if p.keyword in ('choice', 'case'):
+        return _xpath_data_parent(p)
+    if p.keyword in _xpath_data_parents or \
+       p.keyword in ('input', 'output', 'notification'):
+        return p
+    return None
+
+def _xpath_data_parent(node):
+    p = node.parent
+    while p is not None and p.keyword in ('choice', 'case'):
+        p = p.parent
+    if p is None:
+        return None
+    if p.keyword in ('module', 'submodule'):
+        return _xpath_root
+    if p.keyword in ('container', 'list'):
+        return p
+    # the accessible tree for rpcs, actions and notifications is not
+    # followed
+    return None
+
+def _xpath_eval(ctx, stmt, ctxnode, e, nodes):
+    """Return the list of schema nodes selected by the expression `e`
+    from the context `nodes`, or None if it is not known, or if the
+    result is not a node set."""
+    if e[0] == 'path':
+        (_, absolute, steps) = e
+        if absolute:
+            nodes = [_xpath_root]
+        return _xpath_steps(ctx, stmt, ctxnode, steps, nodes)
+    elif e[0] == 'filter':
+        (_, primary, preds, steps) = e
+        res = _xpath_eval(ctx, stmt, ctxnode, primary, nodes)
+        for p in preds:
+            _xpath_eval(ctx, stmt, ctxnode, p, res)
+        return _xpath_steps(ctx, stmt, ctxnode, steps, res)
+    elif e[0] == 'binary':
+        left = _xpath_eval(ctx, stmt, ctxnode, e[2], nodes)
+        right = _xpath_eval(ctx, stmt, ctxnode, e[3], nodes)
+        if e[1] == '|' and left is not None and right is not None:
+            return left + [n for n in right if n not in left]
+        return None
+    elif e[0] == 'function':
+        for a in e[2]:
+            _xpath_eval(ctx, stmt, ctxnode, a, nodes)
+        if e[1] == 'current' and len(e[2]) == 0:
+            return [ctxnode]
+        return None
+    elif e[0] == 'negative':
+        _xpath_eval(ctx, stmt, ctxnode, e[1], nodes)
+    return None
+
+def _xpath_steps(ctx, stmt, ctxnode, steps, nodes):
+    for (axis, nodetest, preds) in steps:
+        if nodes is not None:
+            nodes = _xpath_step(ctx, stmt, ctxnode, axis, nodetest, nodes)
+        for p in preds:
+            _xpath_eval(ctx, stmt, ctxnode, p, nodes)
+    return nodes
+
+def _xpath_step(ctx, stmt, ctxnode, axis, nodetest, nodes):
+    if nodetest == ('node-type', 'node') and axis == 'self':
+        return nodes
+    elif nodetest == ('node-type', 'node') and axis == 'parent':
+        res = []
+        for n in nodes:
+            if n is _xpath_root:
+                continue
+            p = _xpath_data_parent(n)
+            if p is None:
+                return None
+            if p not in res:
+                res.append(p)
+        return res
+    elif axis != 'child' or nodetest[0] != 'name':
+        return None
+    (_, prefix, name) = nodetest
+    if prefix is None:
+        # unprefixed names belong to the module of the initial context
+        # node, which for a when in an augment is the target node
+        if ctxnode is _xpath_root:
+            module = stmt.i_module
+        else:
+            module = ctxnode.i_module
+    else:
+        module = _xpath_prefix_to_module(stmt, prefix)
+        if module is None:
+            # reported by v_xpath
+            return None
+    key = (module.i_modulename, name)
+    res = []
+    for n in nodes:
+        children = _xpath_children(stmt, n, module)
+        if children is None:
+            return None
+        child = children.get(key)
+        if child is not None and child not in res:
+            res.append(child)
+    if len(res) == 0 and len(nodes) > 0:
+        err_add(ctx.errors, stmt.pos, 'XPATH_NODE_NOT_FOUND', key)
+        return None
+    return res
+
+def _xpath_prefix_to_module(stmt, prefix):
+    # prefixes are defined in the module where the expression is
+    # written, which is not stmt.i_module if the expression is copied
+    # from a grouping.  like prefix_to_module(), but errors and unused
+    # prefixes are handled by v_xpath.
+    mod = stmt.i_orig_module
+    if prefix == mod.i_prefix:
+        return mod
+    if prefix not in mod.i_prefixes:
+        return None
+    (modulename, revision) = mod.i_prefixes[prefix]
+    return mod.i_ctx.get_module(modulename, revision)
+
+def _xpath_children(stmt, node, module):
+    """Return a dict of (modulename, name):data node with the children
+    of `node`, or None if they are not known."""
+    if node is _xpath_root:
+        if module.i_modulename == stmt.i_module.i_modulename:
+            module = stmt.i_module
+        elif module.i_is_validated != True:
+            return None
+        if module.keyword != 'module':
+            # the nodes in the other submodules are not known
+            return None
+        node = module
+    elif node.keyword in ('anyxml', 'anydata'):
+        return None
+    elif not hasattr(node, 'i_children'):
+        return {}
+    # the expanded tree is not modified in this phase, so the children
+    # are found once per node for each module validated
+    cache = stmt.i_module.i_xpath_children
+    children = cache.get(node)
+    if children is None:
+        children = {}
+        _xpath_add_children(children, node.i_children)
+        cache[node] = children
+    return children
+
+def _xpath_add_children(children, stmts):
+    for s in stmts:
+        if s.keyword in ('choice', 'case'):
+            _xpath_add_children(children, s.i_children)
+        elif s.keyword not in ('rpc', 'action', 'notification'):
+            key = (s.i_module.i_modulename, s.arg)
+            if key not in children:
+                children[key] = s
+
 def v_reference_deviation(ctx, stmt):
     stmt.i_target_node = find_target_node(ctx, stmt)
 
@@ -2084,6 +2504,7 @@ def v_reference_deviate(ctx, stmt):
                 old = t.search_one(c.keyword)
                 if old is not None:
                     old.arg = c.arg
+                    stmt_changed(old)
                 else:
                     t.substmts.append(c)
                 # make sure the target's children have proper config stmts
@@ -2122,6 +2543,7 @@ def v_reference_deviate(ctx, stmt):
                         and t.i_module.i_prefix !=
                             c.i_module.i_prefix):
                         c.arg = c.i_module.i_prefix + ':' + c.arg
+                        stmt_changed(c)
                     t.substmts.append(c)
 
 # FIXME: after deviation, we need to re-run some of the tests, e.g. if
@@ -2178,7 +2600,7 @@ def v_strict_xpath(ctx, stmt):
         # deref is valid in 1.1
         return
     try:
-        toks = xpath.tokens(stmt.arg)
+        toks = xpath.compile(stmt.arg)
         for (tokname, s) in toks:
             if tokname == 'function' and s == 'deref':
                 err_add(ctx.errors, stmt.pos, 'STRICT_XPATH_FUNCTION', s)
@@ -2239,8 +2661,17 @@ def is_mandatory_node(stmt):
                     return True
     return False
 
+def _arg_candidates(children, identifier):
+    """Return the statements in `children` which may have `identifier`
+    as argument"""
+    if isinstance(children, StmtList):
+        pos = children.arg_positions(identifier)
+        if pos is not None:
+            return [children[i] for i in pos]
+    return children
+
 def search_child(children, modulename, identifier):
-    for child in children:
+    for child in _arg_candidates(children, identifier):
         if child.arg == identifier:
             if ((child.i_module.i_modulename == modulename) or
                 child.i_module.i_including_modulename is not None and
@@ -2252,6 +2683,15 @@ def search_data_node(children, modulename, identifier, last_skipped = None):
     skip = ['choice', 'case']
     if last_skipped is not None:
         skip.append(last_skipped)
+    if isinstance(children, StmtList):
+        pos = children.arg_positions(identifier)
+        if pos is not None:
+            # only the matching children and the ones to skip into
+            # need to be looked at, in list order
+            pos = list(pos)
+            for k in skip:
+                pos.extend(children.keyword_positions(k))
+            children = [children[i] for i in sorted(set(pos))]
     for child in children:
         if child.keyword in skip:
             r = search_data_node(child.i_children,
@@ -2298,7 +2738,7 @@ def search_grouping(stmt, name):
     return None
 
 def search_data_keyword_child(children, modulename, identifier):
-    for child in children:
+    for child in _arg_candidates(children, identifier):
         if ((child.arg == identifier) and
             (child.i_module.i_modulename == modulename) and
             child.keyword in _data_keywords):
@@ -2360,7 +2800,7 @@ def find_target_node(ctx, stmt, is_augment=False):
                                   identifier)
                 v_init_stmt(ctx, child)
                 child.i_module = module
-                child.i_children = []
+                child.i_children = StmtList()
                 child.i_config = node.i_config
                 node.i_children.append(child)
                 # keep track of this temporary statement
@@ -2684,7 +3124,141 @@ def validate_leafref_path(ctx, stmt, path_spec, path,
 
 ## Each statement in YANG is represented as an instance of Statement.
 
+class StmtList(list):
+    """A list of statements, used for `substmts` and `i_children`.
+
+    Long lists are indexed on the keyword and the argument of the
+    statements when they are first searched.  Appending a statement
+    updates the indexes, any other change to the list drops them.  If
+    the keyword or the argument of a statement in a list is changed,
+    stmt_changed() must be called with the statement."""
+
+    threshold = 16
+    """lists shorter than this are searched linearly"""
+
+    _keywords = None
+    """dict of keyword:list of positions"""
+    _args = None
+    """dict of arg:list of positions"""
+
+    def __getstate__(self):
+        # the indexes are rebuilt on demand
+        return None
+
+    def _index(self, attr):
+        idx = getattr(self, attr)
+        if idx is None:
+            idx = {}
+            key = attr[1:-1]
+            for (i, stmt) in enumerate(self):
+                k = getattr(stmt, key)
+                if k in idx:
+                    idx[k].append(i)
+                else:
+                    idx[k] = [i]
+            setattr(self, attr, idx)
+        return idx
+
+    def keyword_positions(self, keyword):
+        """Return the positions of the statements with `keyword`, or None
+        if the list is too short to be indexed."""
+        if len(self) < self.threshold:
+            return None
+        return self._index('_keywords').get(keyword, [])
+
+    def arg_positions(self, arg):
+        """Return the positions of the statements with `arg`, or None
+        if the list is too short to be indexed."""
+        if len(self) < self.threshold:
+            return None
+        return self._index('_args').get(arg, [])
+
+    def _drop(self):
+        self._keywords = None
+        self._args = None
+
+    def append(self, stmt):
+        list.append(self, stmt)
+        i = len(self) - 1
+        if self._keywords is not None:
+            self._keywords.setdefault(stmt.keyword, []).append(i)
+        if self._args is not None:
+            self._args.setdefault(stmt.arg, []).append(i)
+
+    def extend(self, stmts):
+        self._drop()
+        list.extend(self, stmts)
+
+    def __iadd__(self, stmts):
+        self.extend(stmts)
+        return self
+
+    def __imul__(self, n):
+        self._drop()
+        return list.__imul__(self, n)
+
+    def insert(self, i, stmt):
+        self._drop()
+        list.insert(self, i, stmt)
+
+    def remove(self, stmt):
+        self._drop()
+        list.remove(self, stmt)
+
+    def pop(self, *args):
+        self._drop()
+        return list.pop(self, *args)
+
+    def sort(self, *args, **kwargs):
+        self._drop()
+        list.sort(self, *args, **kwargs)
+
+    def reverse(self):
+        self._drop()
+        list.reverse(self)
+
+    def __setitem__(self, i, stmt):
+        self._drop()
+        list.__setitem__(self, i, stmt)
+
+    def __delitem__(self, i):
+        self._drop()
+        list.__delitem__(self, i)
+
+    # python 2
+    def __setslice__(self, i, j, stmts):
+        self._drop()
+        list.__setslice__(self, i, j, stmts)
+
+    def __delslice__(self, i, j):
+        self._drop()
+        list.__delslice__(self, i, j)
+
+def stmt_changed(stmt):
+    """Must be called when the keyword or argument of `stmt` is changed.
+    Drops the indexes of the lists in its parent which may hold it."""
+    p = stmt.parent
+    if p is None:
+        return
+    for l in (p.substmts, getattr(p, 'i_children', None)):
+        if isinstance(l, StmtList):
+            l._drop()
+
+_i_attributes = ('i_module', 'i_orig_module', 'i_typedefs', 'i_groupings',
+                 'i_uniques')
+"""the internal attributes which are set on many statements by the
+validation.  They are stored in slots in the Statement.  All other
+attributes, e.g. the ones set on modules only or by plugins, are stored
+in the statement's __dict__.
+
+As for any attribute, an internal attribute which is not set raises
+AttributeError, so hasattr() can be used to check if it is set."""
+
 class Statement(object):
+    __slots__ = ('top', 'parent', 'pos', 'raw_keyword', 'keyword', 'ext_mod',
+                 'arg', 'substmts', 'is_grammatically_valid') + \
+                 _i_attributes + ('__dict__',)
+
     def __init__(self, top, parent, pos, keyword, arg=None):
         self.top = top
         """pointer to the top-level Statement"""
@@ -2711,14 +3285,58 @@ class Statement(object):
         self.arg = arg
         """the statement's argument;  a string or None"""
 
-        self.substmts = []
+        self.substmts = StmtList()
         """the statement's substatements; a list of Statements"""
 
+    def __copy__(self):
+        cls = self.__class__
+        new = cls.__new__(cls)
+        # these are always set by __init__
+        new.top = self.top
+        new.parent = self.parent
+        new.pos = self.pos
+        new.raw_keyword = self.raw_keyword
+        new.keyword = self.keyword
+        new.ext_mod = self.ext_mod
+        new.substmts = self.substmts
+        for name in _optional_slots:
+            val = getattr(self, name, _missing)
+            if val is not _missing:
+                setattr(new, name, val)
+        # the argument is read from the slot, so that a lazily parsed
+        # argument is not parsed here
+        try:
+            _arg_slot.__set__(new, _arg_slot.__get__(self, cls))
+        except AttributeError:
+            pass
+        d = self.__dict__
+        if d:
+            new.__dict__.update(d)
+        return new
+
+    def __getstate__(self):
+        state = {}
+        for (name, slot) in _slots:
+            try:
+                state[name] = slot.__get__(self, Statement)
+            except AttributeError:
+                pass
+        state.update(self.__dict__)
+        return state
+
+    def __setstate__(self, state):
+        for (name, val) in state.items():
+            setattr(self, name, val)
+
     def search(self, keyword, children=None):
         """Return list of receiver's substmts with `keyword`.
         """
         if children is None:
             children = self.substmts
+        if isinstance(children, StmtList):
+            pos = children.keyword_positions(keyword)
+            if pos is not None:
+                return [children[i] for i in pos]
         return [ ch for ch in children if ch.keyword == keyword ]
 
     def search_one(self, keyword, arg=None, children=None):
@@ -2726,6 +3344,10 @@ class Statement(object):
         """
         if children is None:
             children = self.substmts
+        if isinstance(children, StmtList):
+            pos = children.keyword_positions(keyword)
+            if pos is not None:
+                children = [children[i] for i in pos]
         for ch in children:
             if ch.keyword == keyword and (arg is None or ch.arg == arg):
                 return ch
@@ -2746,7 +3368,7 @@ class Statement(object):
             new.parent = self.parent
         else:
             new.parent = parent
-        new.substmts = []
+        new.substmts = StmtList()
         for s in self.substmts:
             if s.keyword in ignore:
                 pass
@@ -2783,6 +3405,12 @@ class Statement(object):
            print(indent + '--- END i_children ---')
 
 
+_missing = object()
+_slots = [(name, Statement.__dict__[name]) for name in Statement.__slots__
+          if name != '__dict__']
+_optional_slots = ('is_grammatically_valid',) + _i_attributes
+_arg_slot = Statement.__dict__['arg']
+
 ## FIXME: not used
 def validate_status(errors, x, y, defn, ref):
     xstatus = x.status
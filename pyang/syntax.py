@@ -269,6 +269,12 @@ def add_arg_type(arg_type, regexp):
     Used by extension plugins to register their own argument types."""
     arg_type_map[arg_type] = regexp
 
+header_keywords = ['yang-version', 'namespace', 'prefix', 'belongs-to',
+                   'import', 'include',
+                   'organization', 'contact', 'description', 'reference',
+                   'revision']
+"""Statements which may precede the body statements in a module."""
+
     # keyword             argument-name  yin-element
 yin_map = \
     {'action':           ('name',        False),
@@ -447,7 +447,7 @@ class HybridDSDLSchema(object):
             pref = "$pref:"
         else:
             pref = self.prefix_stack[-1] + ":"
-        toks = xpath.tokens(xpe)
+        toks = xpath.compile(xpe)
         prev = None
         res = ""
         for tok in toks:
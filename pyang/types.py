@@ -1,9 +1,13 @@
 """YANG built-in types"""
 
 from .error import err_add
+from .error import Position
 from . import util
 from . import syntax
+from . import xsd_regex
+import re
 import base64
+import collections
 from xml.sax.saxutils import quoteattr
 from xml.sax.saxutils import escape
 
@@ -14,6 +18,12 @@ except ImportError:
     # python 3
     from io import StringIO
 
+re_integer_value = re.compile(r"[-+]?[0-9]+\Z")
+"""an integer value in an instance document"""
+
+_batch_pos = Position('<batch>')
+"""the position of the errors in validate_batch(), which are not reported"""
+
 class Abort(Exception):
     pass
 
@@ -29,9 +39,165 @@ class TypeSpec(object):
     def validate(self, errors, pos, val, errstr=''):
         return True;
 
+    def validate_batch(self, strs):
+        """Validate each string in the sequence `strs` as a value of
+        this type, as written in an instance document.  No errors are
+        reported.
+
+        Integers are read with the lexical rules of XML Schema: decimal
+        digits with an optional sign, and possibly leading zeros, but
+        no whitespace.  This differs from str_to_val(), which reads the
+        values in a module with python's int(s, 0), so e.g. '010' is
+        valid here but not there, and '0x10' and ' 5' are valid there
+        but not here.  The other types are validated with str_to_val()
+        and validate().
+
+        Returns the sorted list of the indexes of the strings which are
+        not valid values."""
+        return _validate_batch(self, strs)
+
+    def int_ranges(self):
+        """Return the list of the intervals (lo, hi) of the valid values
+        of an integer type, or None if this is not an integer type"""
+        return None
+
+    def lexical_tests(self):
+        """Return a list of cheap tests which a string must pass to be
+        a valid value of this type.  Each test is one of:
+
+          ('match', regexp)  - regexp.match(s) must succeed
+          ('search', regexp) - regexp.search(s) must fail
+          ('in', names)      - s must be in the set names
+          ('any', tests)     - s must pass one of the lists of tests
+          ('never', None)    - no string is valid
+
+        A string which passes the tests is not necessarily valid."""
+        return []
+
     def restrictions(self):
         return []
 
+def _validate_batch(spec, strs, invalid=()):
+    """Validate the strings in `strs` one by one with spec.str_to_val()
+    and spec.validate().  Each distinct string is validated once.  The
+    strings in `invalid` are never valid."""
+    bad = []
+    results = {}
+    for (i, s) in enumerate(strs):
+        try:
+            ok = results[s]
+        except KeyError:
+            ok = False
+            if s not in invalid:
+                errors = []
+                val = spec.str_to_val(errors, _batch_pos, s)
+                if val is not None and len(errors) == 0:
+                    spec.validate(errors, _batch_pos, val)
+                    ok = len(errors) == 0
+            results[s] = ok
+        if not ok:
+            bad.append(i)
+    return bad
+
+def _lexical_ok(tests, s):
+    """Return False if the string `s` fails one of the `tests` returned
+    by TypeSpec.lexical_tests()"""
+    for (kind, x) in tests:
+        if kind == 'match':
+            if x.match(s) is None:
+                return False
+        elif kind == 'search':
+            if x.search(s) is not None:
+                return False
+        elif kind == 'in':
+            if s not in x:
+                return False
+        elif kind == 'any':
+            for tests1 in x:
+                if _lexical_ok(tests1, s):
+                    break
+            else:
+                return False
+        else:
+            return False
+    return True
+
+def _lexical_filter(tests):
+    """Return a function f(s) which returns a false value if the string
+    `s` fails one of the `tests`, or None if there are no tests"""
+    if tests == []:
+        return None
+    elif len(tests) == 1:
+        (kind, x) = tests[0]
+        if kind == 'match':
+            return x.match
+        elif kind == 'in':
+            return x.__contains__
+        elif kind == 'search':
+            search = x.search
+            return lambda s: search(s) is None
+    return lambda s: _lexical_ok(tests, s)
+
+_numpy_module = False
+"""the numpy module, None if it is not installed, or False if it has not
+been imported yet"""
+
+def _numpy():
+    """Return the numpy module, or None if it is not installed.  It is
+    imported on first use, since importing it is slow."""
+    global _numpy_module
+    if _numpy_module is False:
+        try:
+            import numpy
+            _numpy_module = numpy
+        except ImportError:
+            _numpy_module = None
+    return _numpy_module
+
+_re_int_lexical = re.compile(r"\s*[-+]?\d", re.UNICODE)
+"""the start of any string accepted by int(s, 0)"""
+
+def _validate_int_batch(strs, ranges):
+    """Validate the strings in `strs` as integers in one of the
+    inclusive intervals in `ranges`.  The range check is done with
+    numpy, if it is installed and the values fit in 64 bits."""
+    bad = []
+    idxs = []
+    vals = []
+    match = re_integer_value.match
+    for (i, s) in enumerate(strs):
+        if match(s) is None:
+            bad.append(i)
+        else:
+            idxs.append(i)
+            vals.append(int(s))
+    if len(vals) == 0:
+        return bad
+    arr = None
+    numpy = _numpy()
+    if numpy is not None:
+        try:
+            arr = numpy.array(vals, dtype=numpy.int64)
+        except OverflowError:
+            pass
+    if arr is not None:
+        lo64 = -9223372036854775808
+        hi64 = 9223372036854775807
+        ok = numpy.zeros(len(arr), dtype=bool)
+        for (lo, hi) in ranges:
+            if lo <= hi64 and hi >= lo64:
+                ok |= (arr >= max(lo, lo64)) & (arr <= min(hi, hi64))
+        bad.extend(numpy.array(idxs)[~ok].tolist())
+    else:
+        for (i, v) in zip(idxs, vals):
+            for (lo, hi) in ranges:
+                if lo <= v <= hi:
+                    break
+            else:
+                bad.append(i)
+    bad.sort()
+    return bad
+
 class IntTypeSpec(TypeSpec):
     def __init__(self, name, min, max):
         TypeSpec.__init__(self, name)
@@ -56,6 +222,16 @@ class IntTypeSpec(TypeSpec):
         else:
             return True
 
+    def validate_batch(self, strs):
+        # the lexical rules of XML Schema, see TypeSpec.validate_batch()
+        return _validate_int_batch(strs, self.int_ranges())
+
+    def int_ranges(self):
+        return [(self.min, self.max)]
+
+    def lexical_tests(self):
+        return [('match', _re_int_lexical)]
+
     def restrictions(self):
         return ['range']
 
@@ -169,6 +345,12 @@ class Decimal64TypeSpec(TypeSpec):
         else:
             return True
 
+    def validate_batch(self, strs):
+        return _validate_batch(self, strs, ('min', 'max'))
+
+    def lexical_tests(self):
+        return [('match', syntax.re_decimal)]
+
     def restrictions(self):
         return ['range']
 
@@ -184,6 +366,9 @@ class BooleanTypeSpec(TypeSpec):
                     (str, self.definition, 'not a boolean'))
             return None
 
+    def lexical_tests(self):
+        return [('in', frozenset(['true', 'false']))]
+
 class StringTypeSpec(TypeSpec):
     def __init__(self):
         TypeSpec.__init__(self, 'string')
@@ -213,6 +398,13 @@ class EmptyTypeSpec(TypeSpec):
         err_add(errors, pos, 'BAD_DEFAULT_VALUE', 'empty')
         return None
 
+    def validate_batch(self, strs):
+        return [i for (i, s) in enumerate(strs) if s != '']
+
+    def lexical_tests(self):
+        # str_to_val() never accepts a value
+        return [('never', None)]
+
 class IdentityrefTypeSpec(TypeSpec):
     def __init__(self, idbases):
         TypeSpec.__init__(self, 'identityref')
@@ -238,9 +430,10 @@ class IdentityrefTypeSpec(TypeSpec):
                     (s, self.definition, 'identityref not found'))
             return None
         val = pmodule.i_identities[name]
+        index = pmodule.i_ctx.identity_index
         for idbase in self.idbases:
             my_identity = idbase.i_identity
-            if not is_derived_from_or_self(val, my_identity, []):
+            if not index.is_derived_from_or_self(val, my_identity):
                 err_add(errors, pos, 'TYPE_VALUE',
                         (s, self.definition,
                          'identityref not derived from %s' % \
@@ -249,6 +442,131 @@ class IdentityrefTypeSpec(TypeSpec):
         else:
             return val
 
+    def valid_identities(self):
+        """Return the list of the identities which are valid values"""
+        index = self.idbases[0].i_module.i_ctx.identity_index
+        return index.derived_from_all([b.i_identity for b in self.idbases
+                                       if b.i_identity is not None])
+
+class IdentityIndex(object):
+    """The transitive closure of the base relation between the
+    identities in a context.
+
+    Each module is added with add_module() after its type phase, when
+    the bases of its identities are resolved.  The ancestors and
+    descendants of each identity are computed when first asked for, and
+    then looked up in constant time."""
+
+    def __init__(self):
+        self._identities = []
+        """all identities added, in the order they were added"""
+        self._added = set()
+        self._modules = set()
+        self._derived = {}
+        """dict of identity:list of identities with it as a direct base"""
+        self._ancestors = {}
+        self._descendants = {}
+
+    def add_module(self, module):
+        """Add the identities defined in `module` and its submodules"""
+        if module in self._modules:
+            return
+        self._modules.add(module)
+        for identity in module.i_identities.values():
+            self.add_identity(identity)
+
+    def add_identity(self, identity):
+        if identity in self._added:
+            return
+        self._added.add(identity)
+        self._identities.append(identity)
+        for b in self.bases(identity):
+            self._derived.setdefault(b, []).append(identity)
+        # the descendants of the bases have changed
+        self._descendants = {}
+
+    def del_module(self, module):
+        """Remove the identities defined in `module`"""
+        if module not in self._modules:
+            return
+        self._modules.discard(module)
+        removed = set(module.i_identities.values()) & self._added
+        self._added -= removed
+        self._identities = [i for i in self._identities if i not in removed]
+        for (b, derived) in list(self._derived.items()):
+            self._derived[b] = [i for i in derived if i not in removed]
+        for i in removed:
+            self._derived.pop(i, None)
+        # the ancestors of an identity in another module may include a
+        # removed identity
+        self._ancestors = {}
+        self._descendants = {}
+
+    def bases(self, identity):
+        """Return the identities which are direct bases of `identity`"""
+        return [base.i_identity for base in identity.search('base')
+                if getattr(base, 'i_identity', None) is not None]
+
+    def derived(self, identity):
+        """Return the identities with `identity` as a direct base, in
+        the order they were added"""
+        return self._derived.get(identity, [])
+
+    def ancestors(self, identity):
+        """Return the set of identities `identity` is derived from,
+        directly or indirectly"""
+        try:
+            return self._ancestors[identity]
+        except KeyError:
+            pass
+        res = set()
+        todo = self.bases(identity)
+        while len(todo) > 0:
+            b = todo.pop()
+            if b not in res:
+                res.add(b)
+                todo.extend(self.bases(b))
+        res = frozenset(res)
+        if identity in self._added:
+            # otherwise its bases may not be resolved yet
+            self._ancestors[identity] = res
+        return res
+
+    def descendants(self, identity):
+        """Return the set of identities derived from `identity`, directly
+        or indirectly"""
+        try:
+            return self._descendants[identity]
+        except KeyError:
+            pass
+        res = set()
+        todo = list(self.derived(identity))
+        while len(todo) > 0:
+            i = todo.pop()
+            if i not in res:
+                res.add(i)
+                todo.extend(self.derived(i))
+        res = frozenset(res)
+        self._descendants[identity] = res
+        return res
+
+    def is_derived_from(self, a, b):
+        """Return True if the identity `a` is derived from `b`"""
+        return b in self.ancestors(a)
+
+    def is_derived_from_or_self(self, a, b):
+        return a is b or b in self.ancestors(a)
+
+    def derived_from_all(self, bases):
+        """Return the identities derived from all identities in `bases`,
+        in the order they were added"""
+        if len(bases) == 0:
+            return []
+        res = self.descendants(bases[0])
+        for b in bases[1:]:
+            res = res & self.descendants(b)
+        return [i for i in self._identities if i in res]
+
 def is_derived_from_or_self(a, b, visited):
     # return True if a is derived from b
     if a == b:
@@ -335,6 +653,48 @@ class RangeTypeSpec(TypeSpec):
                  ' for range defined at ' + str(self.ranges_pos)))
         return False
 
+    def validate_batch(self, strs):
+        ranges = self.int_ranges()
+        if ranges is None:
+            return _validate_batch(self, strs, ('min', 'max'))
+        return _validate_int_batch(strs, ranges)
+
+    def int_ranges(self):
+        try:
+            return self._int_ranges
+        except AttributeError:
+            pass
+        base_ranges = self.base.int_ranges()
+        if base_ranges is None:
+            self._int_ranges = None
+            return None
+        lo0 = base_ranges[0][0]
+        hi0 = base_ranges[-1][1]
+        def bound(v, default):
+            if v == 'min':
+                return lo0
+            elif v == 'max':
+                return hi0
+            elif v is None:
+                return default
+            return v
+        # intersect the base intervals with our intervals
+        res = []
+        for (lo, hi) in self.ranges:
+            lo = bound(lo, None)
+            hi = bound(hi, lo)
+            if lo is None or hi is None:
+                # bad range; an error has been reported
+                continue
+            for (blo, bhi) in base_ranges:
+                if max(lo, blo) <= min(hi, bhi):
+                    res.append((max(lo, blo), min(hi, bhi)))
+        self._int_ranges = res
+        return res
+
+    def lexical_tests(self):
+        return self.base.lexical_tests()
+
     def restrictions(self):
         return self.base.restrictions()
 
@@ -413,19 +773,61 @@ class LengthTypeSpec(TypeSpec):
                  ' for length defined at ' + str(self.length_pos)))
         return False
 
+    def lexical_tests(self):
+        return self.base.lexical_tests()
+
     def restrictions(self):
         return self.base.restrictions()
 
 
-def _validate_pattern_libxml2(errors, stmt, invert_match):
+class _Libxml2Pattern(object):
+    """A pattern compiled with libxml2.
+
+    When pickled, only the pattern string is saved; the pattern is
+    compiled again when it is loaded."""
+    def __init__(self, pattern):
+        import libxml2
+        self.pattern = pattern
+        self.re = libxml2.regexpCompile(pattern)
+
+    def regexpExec(self, val):
+        return self.re.regexpExec(val)
+
+    def __reduce__(self):
+        return (_Libxml2Pattern, (self.pattern,))
+
+class _LxmlPattern(object):
+    """A pattern compiled into an XML Schema with lxml.
+
+    When pickled, only the pattern string is saved; the pattern is
+    compiled again when it is loaded."""
+    def __init__(self, pattern):
+        import lxml.etree
+        doc = StringIO(
+            '<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema">' \
+            '  <xsd:element name="a" type="x"/>' \
+            '    <xsd:simpleType name="x">' \
+            '      <xsd:restriction base="xsd:string">' \
+            '        <xsd:pattern value=%s/>' \
+            '      </xsd:restriction>' \
+            '     </xsd:simpleType>' \
+            '   </xsd:schema>' % quoteattr(pattern))
+        self.pattern = pattern
+        self.schema = lxml.etree.XMLSchema(lxml.etree.parse(doc))
+
+    def validate(self, doc):
+        return self.schema.validate(doc)
+
+    def __reduce__(self):
+        return (_LxmlPattern, (self.pattern,))
+
+def _compile_pattern_libxml2(pattern):
     try:
         import libxml2
         try:
-            re = libxml2.regexpCompile(stmt.arg)
-            return ('libxml2', re, stmt.pos, invert_match)
+            return ('libxml2', _Libxml2Pattern(pattern))
         except libxml2.treeError as v:
-            err_add(errors, stmt.pos, 'PATTERN_ERROR', str(v))
-            return None
+            return str(v)
     except ImportError:
     ## Do not report a warning in this case.  Maybe we should add some
     ## flag to turn on this warning...
@@ -434,42 +836,100 @@ def _validate_pattern_libxml2(errors, stmt, invert_match):
     #                    "(see http://xmlsoft.org for installation help)")
         return False
 
-def _validate_pattern_lxml(errors, stmt, invert_match):
+def _compile_pattern_lxml(pattern):
     try:
         import lxml.etree
-        doc = StringIO(
-            '<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema">' \
-            '  <xsd:element name="a" type="x"/>' \
-            '    <xsd:simpleType name="x">' \
-            '      <xsd:restriction base="xsd:string">' \
-            '        <xsd:pattern value=%s/>' \
-            '      </xsd:restriction>' \
-            '     </xsd:simpleType>' \
-            '   </xsd:schema>' % quoteattr(stmt.arg))
         try:
-            sch = lxml.etree.XMLSchema(lxml.etree.parse(doc))
-            return ('lxml', sch, stmt.pos, invert_match)
+            return ('lxml', _LxmlPattern(pattern))
         except lxml.etree.XMLSchemaParseError as v:
-            err_add(errors, stmt.pos, 'PATTERN_ERROR', str(v))
-            return None
+            return str(v)
     except ImportError:
         return False
 
-def validate_pattern_expr(errors, stmt):
-    invert_match = False
-    if stmt.search_one('modifier', arg='invert-match') is not None:
-        invert_match = True
-    ## check that it's syntactically correct
-    # First try with lxml
-    res = _validate_pattern_lxml(errors, stmt, invert_match)
+def compile_pattern(pattern):
+    """Compile the YANG pattern string `pattern`.
+
+    Return a tuple (type, compiled pattern), where type is 'python',
+    'lxml' or 'libxml2', an error message if the pattern is not valid,
+    or None if it cannot be compiled."""
+    # First try to translate it into a python regexp
+    try:
+        return ('python', xsd_regex.compile(pattern))
+    except NotImplementedError:
+        error = None
+    except SyntaxError as v:
+        # lxml and libxml2 accept some patterns that are not valid
+        # according to the XML Schema spec, so let them decide
+        error = str(v)
+    # Then try with lxml
+    res = _compile_pattern_lxml(pattern)
     if res is not False:
         return res
     # Then try with libxml2
-    res = _validate_pattern_libxml2(errors, stmt, invert_match)
+    res = _compile_pattern_libxml2(pattern)
     if res is not False:
         return res
     # Otherwise we can't validate patterns :(
-    return None
+    return error
+
+class PatternCache(object):
+    """A cache of compiled patterns, shared by all contexts.
+
+    Maps a pattern string to the result of compile_pattern(), so each
+    pattern is compiled once, and an invalid pattern is reported
+    without compiling it again.  When the cache is full, the least
+    recently used pattern is dropped."""
+    def __init__(self, size=1000):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._cache = collections.OrderedDict()
+
+    def get(self, pattern):
+        try:
+            res = self._cache.pop(pattern)
+            self.hits += 1
+        except KeyError:
+            res = compile_pattern(pattern)
+            self.misses += 1
+            if len(self._cache) >= self.size:
+                self._cache.popitem(last=False)
+        self._cache[pattern] = res
+        return res
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+pattern_cache = PatternCache()
+
+def validate_pattern_expr(errors, stmt):
+    invert_match = False
+    if stmt.search_one('modifier', arg='invert-match') is not None:
+        invert_match = True
+    ## check that it's syntactically correct
+    res = pattern_cache.get(stmt.arg)
+    if res is None:
+        return None
+    elif type(res) is not tuple:
+        err_add(errors, stmt.pos, 'PATTERN_ERROR', res)
+        return None
+    (type_, re) = res
+    return (type_, re, stmt.pos, invert_match, stmt.arg)
+
+def _pattern_match(type_, re, val):
+    if type_ == 'python':
+        return re.match(val) is not None
+    elif type_ == 'libxml2':
+        return re.regexpExec(val) == 1
+    elif type_ == 'lxml':
+        import lxml
+        doc = StringIO('<a>%s</a>' % escape(val))
+        return re.validate(lxml.etree.parse(doc))
 
 class PatternTypeSpec(TypeSpec):
     def __init__(self, base, pattern_specs):
@@ -483,21 +943,75 @@ class PatternTypeSpec(TypeSpec):
     def validate(self, errors, pos, val, errstr=''):
         if self.base.validate(errors, pos, val, errstr) == False:
             return False
-        for (type_, re, re_pos, invert_match) in self.res:
-            if type_ == 'libxml2':
-                is_valid = re.regexpExec(val) == 1
-            elif type_ == 'lxml':
-                import lxml
-                doc = StringIO('<a>%s</a>' % escape(val))
-                is_valid = re.validate(lxml.etree.parse(doc))
-            if ((not is_valid and not invert_match) or
-                (is_valid and invert_match)):
+        for (type_, re, re_pos, invert_match, _p) in self.res:
+            if _pattern_match(type_, re, val) == invert_match:
                 err_add(errors, pos, 'TYPE_VALUE',
                         (val, self.definition, 'pattern mismatch' + errstr +
                          ' for pattern defined at ' + str(re_pos)))
                 return False
         return True
 
+    def validate_batch(self, strs):
+        bad = set(self.base.validate_batch(strs))
+        match = self._batch_match()
+        results = {}
+        for (i, s) in enumerate(strs):
+            if i in bad:
+                continue
+            try:
+                ok = results[s]
+            except KeyError:
+                ok = results[s] = match(s)
+            if not ok:
+                bad.add(i)
+        return sorted(bad)
+
+    def _batch_match(self):
+        """Return a function which returns True if a value matches all
+        patterns.  If all patterns are python regexps, they are combined
+        into one regexp with lookaheads, so each value is matched once."""
+        try:
+            combined = self._combined_re
+        except AttributeError:
+            combined = None
+            if all(r[0] == 'python' for r in self.res):
+                regexp = ''
+                for (_type, r, _pos, invert_match, _p) in self.res:
+                    if invert_match:
+                        regexp += '(?!%s)' % r.pattern
+                    else:
+                        regexp += '(?=%s)' % r.pattern
+                combined = re.compile(regexp)
+            # a compiled regexp can be pickled, a function cannot
+            self._combined_re = combined
+        if combined is not None:
+            m = combined.match
+            return lambda val: m(val) is not None
+        def match(val):
+            for (type_, re, _pos, invert_match, _p) in self.res:
+                if _pattern_match(type_, re, val) == invert_match:
+                    return False
+            return True
+        return match
+
+    def lexical_tests(self):
+        try:
+            return self._lexical_tests
+        except AttributeError:
+            pass
+        tests = list(self.base.lexical_tests())
+        for (_type, _re, _pos, invert_match, pattern) in self.res:
+            if invert_match:
+                continue
+            try:
+                outside = xsd_regex.outside_alphabet(pattern)
+            except (SyntaxError, NotImplementedError):
+                outside = None
+            if outside is not None:
+                tests.append(('search', outside))
+        self._lexical_tests = tests
+        return tests
+
     def restrictions(self):
         return self.base.restrictions()
 
@@ -576,6 +1090,13 @@ class EnumTypeSpec(TypeSpec):
         else:
             return True
 
+    def validate_batch(self, strs):
+        names = set([name for (name, _value) in self.enums])
+        return [i for (i, s) in enumerate(strs) if s not in names]
+
+    def lexical_tests(self):
+        return [('in', frozenset([name for (name, _value) in self.enums]))]
+
     def get_value(self, val):
         r  = util.keysearch(val, 0, self.enums)
         if r is not None:
@@ -846,6 +1367,13 @@ class PathTypeSpec(TypeSpec):
             # if a default value is verified
             return True
 
+    def validate_batch(self, strs):
+        if hasattr(self, 'i_target_node'):
+            return self.i_target_node.search_one('type').\
+                i_type_spec.validate_batch(strs)
+        else:
+            return []
+
     def restrictions(self):
         return ['require-instance']
 
@@ -859,17 +1387,59 @@ class UnionTypeSpec(TypeSpec):
         return str
 
     def validate(self, errors, pos, str, errstr = ''):
-        # try to validate against each membertype
-        for t in self.types:
-            if t.i_type_spec != None:
-                val = t.i_type_spec.str_to_val([], pos, str)
-                if val != None:
-                    if t.i_type_spec.validate([], pos, val):
-                        return True;
+        # try to validate against each membertype, in order, but skip
+        # the member types whose lexical tests fail
+        try:
+            dispatch = self._dispatch
+        except AttributeError:
+            dispatch = self._dispatch = \
+                [(t.i_type_spec, _lexical_filter(tests))
+                 for (t, tests) in self.member_tests()]
+        for (spec, accepts) in dispatch:
+            if accepts is not None and not accepts(str):
+                continue
+            val = spec.str_to_val([], pos, str)
+            if val != None:
+                if spec.validate([], pos, val):
+                    return True;
         err_add(errors, pos, 'TYPE_VALUE',
                 (str, self.definition, 'no member type matched' + errstr))
         return False
 
+    def member_tests(self):
+        """Return a list of (type, lexical tests) for the member types"""
+        try:
+            return self._member_tests
+        except AttributeError:
+            pass
+        self._member_tests = [(t, t.i_type_spec.lexical_tests())
+                              for t in self.types
+                              if t.i_type_spec != None]
+        return self._member_tests
+
+    def lexical_tests(self):
+        tests = [tests for (_t, tests) in self.member_tests()]
+        if [] in tests:
+            # some member type has no tests
+            return []
+        return [('any', tests)]
+
+    def __getstate__(self):
+        # the functions in _dispatch cannot be pickled
+        state = self.__dict__.copy()
+        state.pop('_dispatch', None)
+        return state
+
+    def validate_batch(self, strs):
+        # validate the values which do not match the previous member
+        # types against each member type
+        bad = list(range(len(strs)))
+        for t in self.types:
+            if t.i_type_spec != None and len(bad) > 0:
+                res = t.i_type_spec.validate_batch([strs[i] for i in bad])
+                bad = [bad[j] for j in res]
+        return bad
+
 yang_type_specs = \
   {'int8':IntTypeSpec('int8', -128, 127),
    'int16':IntTypeSpec('int16', -32768, 32767),
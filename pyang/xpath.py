@@ -1,5 +1,6 @@
 import re
 import sys
+import collections
 
 # not 100% XPath / XML, but good enough for YANG
 namestr=r'[a-zA-Z_][a-zA-Z0-9_\-.]*'
@@ -13,6 +14,8 @@ patterns = [
     (')', re.compile(r'\)')),
     ('[', re.compile(r'\[')),
     (']', re.compile(r'\]')),
+    # a number may start with '.'
+    ('number', re.compile(r'[0-9]+(\.[0-9]*)?|\.[0-9]+')),
     ('..', re.compile(r'\.\.')),
     ('.', re.compile(r'\.')),
     ('@', re.compile(r'\@')),
@@ -32,7 +35,6 @@ patterns = [
     ('<', re.compile(r'<')),
     ('*', re.compile(r'\*')),
     # others
-    ('number', re.compile(r'[0-9]+(\.[0-9]+)?')),
     ('prefix-test', re.compile(prefixteststr)),
     ('name', re.compile(ncnamestr)),
     ('attribute', re.compile(r'\@' + ncnamestr)),
@@ -40,6 +42,18 @@ patterns = [
     ('literal', re.compile(r'(\".*?\")|(\'.*?\')')),
     ]
 
+# all patterns in one regexp; the alternatives are tried in the same
+# order as the patterns
+_tok_res = []
+_tok_names = {}
+"""dict of group index in _re_tok:token name"""
+_ngroups = 0
+for (_tokname, _r) in patterns:
+    _tok_res.append('(' + _r.pattern + ')')
+    _tok_names[_ngroups + 1] = _tokname
+    _ngroups += 1 + _r.groups
+_re_tok = re.compile('|'.join(_tok_res))
+
 operators = [ 'div', 'and', 'or', 'mod' ]
 node_types = [ 'comment', 'text', 'processing-instruction', 'node' ]
 axes = [ 'ancestor-or-self', 'ancestor', 'attribute', 'child',
@@ -63,54 +77,111 @@ def tokens(s):
       ('wildcard', '*')
       ('axis', axisname)
     """
+    return list(compile(s))
+
+cache_size = 1000
+"""the maximum number of expressions in the cache used by compile()"""
+
+_cache = collections.OrderedDict()
+"""dict of expression:tuple of tokens, or the message of the SyntaxError"""
+
+def compile(s):
+    """Return a tuple of the tokens in the expression `s`, as returned
+    by tokens(), or throw SyntaxError on failure.
+
+    The result is cached, so the same expression in different
+    statements is tokenized only once.
+    """
+    return _cached(_cache, s, lambda s: tuple(_tokenize(s)))
+
+_parse_cache = collections.OrderedDict()
+"""dict of expression:syntax tree, or the message of the SyntaxError"""
+
+def parse(s):
+    """Return the syntax tree of the XPath expression `s`, or throw
+    SyntaxError on failure.
+
+    The tree is built from tuples:
+      ('path', absolute, steps)
+      ('filter', expr, predicates, steps)
+      ('binary', operator, left, right)
+      ('negative', expr)
+      ('literal', string)
+      ('number', string)
+      ('variable', name)
+      ('function', name, args)
+    where a step is a tuple (axis, nodetest, predicates), and a nodetest
+    is one of:
+      ('name', prefix, name)
+      ('wildcard', prefix)
+      ('node-type', type)
+    A missing prefix is None.  An abbreviated step is expanded, e.g. '..'
+    is ('parent', ('node-type', 'node'), ()), and '//' is a
+    'descendant-or-self' step.
+
+    The result is cached like the result of compile().
+    """
+    return _cached(_parse_cache, s, lambda s: _Parser(s).parse())
+
+def _cached(cache, s, f):
+    res = cache.pop(s, None)
+    if res is None:
+        try:
+            res = f(s)
+        except SyntaxError as e:
+            res = str(e)
+        if len(cache) >= cache_size:
+            cache.popitem(last=False)
+    cache[s] = res
+    if type(res) is str:
+        raise SyntaxError(res)
+    return res
+
+def _tokenize(s):
     pos = 0
     toks = []
     while pos < len(s):
-        matched = False
-        for (tokname, r) in patterns:
-            m = r.match(s, pos)
-            if m is not None:
-                # found a matching token
-                prec = _preceding_token(toks)
-                if tokname == '*' and prec is not None and _is_special(prec):
-                    # XPath 1.0 spec, 3.7 special rule 1a
-                    # interpret '*' as a wildcard
-                    tok = ('wildcard', m.group(0))
-                elif (tokname == 'name' and
-                      prec is not None and not _is_special(prec) and
-                      m.group(0) in operators):
-                    # XPath 1.0 spec, 3.7 special rule 1b
-                    # interpret the name as an operator
-                    tok = (m.group(0), m.group(0))
-                elif tokname == 'name':
-                    # check if next token is '('
-                    if re_open_para.match(s, pos + len(m.group(0))):
-                        # XPath 1.0 spec, 3.7 special rule 2
-                        if m.group(0) in node_types:
-                            # XPath 1.0 spec, 3.7 special rule 2a
-                            tok = (m.group(0), m.group(0))
-                        else:
-                            # XPath 1.0 spec, 3.7 special rule 2b
-                            tok = ('function', m.group(0))
-                    # check if next token is '::'
-                    elif re_axis.match(s, pos + len(m.group(0))):
-                        # XPath 1.0 spec, 3.7 special rule 3
-                        if m.group(0) in axes:
-                            tok = ('axis', m.group(0))
-                        else:
-                            e = "%s: unknown axis %s" % (pos+1, m.group(0))
-                            raise SyntaxError(e)
-                    else:
-                        tok = ('name', m.group(0))
-                else:
-                    tok = (tokname, m.group(0))
-                pos += len(m.group(0))
-                toks.append(tok)
-                matched = True
-                break
-        if matched == False:
+        m = _re_tok.match(s, pos)
+        if m is None:
             # no patterns matched
             raise SyntaxError("at position %s" % str(pos+1))
+        # found a matching token
+        tokname = _tok_names[m.lastindex]
+        prec = _preceding_token(toks)
+        if tokname == '*' and prec is not None and _is_special(prec):
+            # XPath 1.0 spec, 3.7 special rule 1a
+            # interpret '*' as a wildcard
+            tok = ('wildcard', m.group(0))
+        elif (tokname == 'name' and
+              prec is not None and not _is_special(prec) and
+              m.group(0) in operators):
+            # XPath 1.0 spec, 3.7 special rule 1b
+            # interpret the name as an operator
+            tok = (m.group(0), m.group(0))
+        elif tokname == 'name':
+            # check if next token is '('
+            if re_open_para.match(s, pos + len(m.group(0))):
+                # XPath 1.0 spec, 3.7 special rule 2
+                if m.group(0) in node_types:
+                    # XPath 1.0 spec, 3.7 special rule 2a
+                    tok = (m.group(0), m.group(0))
+                else:
+                    # XPath 1.0 spec, 3.7 special rule 2b
+                    tok = ('function', m.group(0))
+            # check if next token is '::'
+            elif re_axis.match(s, pos + len(m.group(0))):
+                # XPath 1.0 spec, 3.7 special rule 3
+                if m.group(0) in axes:
+                    tok = ('axis', m.group(0))
+                else:
+                    e = "%s: unknown axis %s" % (pos+1, m.group(0))
+                    raise SyntaxError(e)
+            else:
+                tok = ('name', m.group(0))
+        else:
+            tok = (tokname, m.group(0))
+        pos += len(m.group(0))
+        toks.append(tok)
     return toks
 
 def _preceding_token(toks):
@@ -128,10 +199,186 @@ def _is_special(tok):
     return tok in _special_toks
 
 
+_descendant_or_self = ('descendant-or-self', ('node-type', 'node'), ())
+_step_toks = ['name', 'wildcard', '*', 'prefix-test', '@', 'axis',
+              '.', '..'] + node_types
+_primary_toks = ['variable', 'literal', 'number', 'function', '(']
+
+class _Parser(object):
+    """Recursive descent parser for the XPath 1.0 grammar, over the
+    tokens from compile()"""
+
+    def __init__(self, s):
+        self.toks = []
+        pos = 0
+        for (tokname, x) in compile(s):
+            if tokname != 'whitespace':
+                self.toks.append((tokname, x, pos))
+            pos += len(x)
+        self.toks.append((None, None, pos))
+        self.i = 0
+
+    def parse(self):
+        e = self.expr()
+        if self.peek() is not None:
+            self.error()
+        return e
+
+    def peek(self):
+        return self.toks[self.i][0]
+
+    def next(self):
+        tok = self.toks[self.i]
+        self.i += 1
+        return tok
+
+    def expect(self, tokname):
+        if self.peek() != tokname:
+            self.error()
+        return self.next()
+
+    def error(self):
+        (tokname, x, pos) = self.toks[self.i]
+        if tokname is None:
+            raise SyntaxError("at position %s: unexpected end of expression"
+                              % str(pos+1))
+        raise SyntaxError("at position %s: unexpected %s" % (str(pos+1), x))
+
+    def binary(self, ops, operand):
+        e = operand()
+        while self.peek() in ops:
+            op = self.next()[0]
+            e = ('binary', op, e, operand())
+        return e
+
+    def expr(self):
+        return self.binary(('or',), self.and_expr)
+
+    def and_expr(self):
+        return self.binary(('and',), self.equality_expr)
+
+    def equality_expr(self):
+        return self.binary(('=', '!='), self.relational_expr)
+
+    def relational_expr(self):
+        return self.binary(('<', '>', '<=', '>='), self.additive_expr)
+
+    def additive_expr(self):
+        return self.binary(('+', '-'), self.multiplicative_expr)
+
+    def multiplicative_expr(self):
+        return self.binary(('*', 'div', 'mod'), self.unary_expr)
+
+    def unary_expr(self):
+        if self.peek() == '-':
+            self.next()
+            return ('negative', self.unary_expr())
+        return self.binary(('|',), self.path_expr)
+
+    def path_expr(self):
+        tokname = self.peek()
+        if tokname in _primary_toks:
+            e = self.primary_expr()
+            preds = self.predicates()
+            steps = ()
+            if self.peek() in ('/', '//'):
+                steps = self.relative_path()
+            if len(preds) == 0 and len(steps) == 0:
+                return e
+            return ('filter', e, preds, steps)
+        elif tokname == '/':
+            self.next()
+            if self.peek() in _step_toks:
+                return ('path', True, self.relative_path(first=True))
+            return ('path', True, ())
+        elif tokname == '//':
+            return ('path', True, self.relative_path())
+        elif tokname in _step_toks:
+            return ('path', False, self.relative_path(first=True))
+        self.error()
+
+    def relative_path(self, first=False):
+        steps = []
+        if first:
+            steps.append(self.step())
+        while self.peek() in ('/', '//'):
+            if self.next()[0] == '//':
+                steps.append(_descendant_or_self)
+            steps.append(self.step())
+        return tuple(steps)
+
+    def step(self):
+        tokname = self.peek()
+        if tokname == '.':
+            self.next()
+            return ('self', ('node-type', 'node'), ())
+        elif tokname == '..':
+            self.next()
+            return ('parent', ('node-type', 'node'), ())
+        axis = 'child'
+        if tokname == '@':
+            self.next()
+            axis = 'attribute'
+        elif tokname == 'axis':
+            axis = self.next()[1]
+            self.expect('::')
+        return (axis, self.node_test(), self.predicates())
+
+    def node_test(self):
+        (tokname, x, _pos) = self.next()
+        if tokname == 'name':
+            i = x.find(':')
+            if i == -1:
+                return ('name', None, x)
+            return ('name', x[:i], x[i+1:])
+        elif tokname in ('wildcard', '*'):
+            return ('wildcard', None)
+        elif tokname == 'prefix-test':
+            return ('wildcard', x[:x.find(':')])
+        elif tokname in node_types:
+            self.expect('(')
+            if tokname == 'processing-instruction' and self.peek() == 'literal':
+                self.next()
+            self.expect(')')
+            return ('node-type', tokname)
+        self.i -= 1
+        self.error()
+
+    def predicates(self):
+        preds = []
+        while self.peek() == '[':
+            self.next()
+            preds.append(self.expr())
+            self.expect(']')
+        return tuple(preds)
+
+    def primary_expr(self):
+        (tokname, x, _pos) = self.next()
+        if tokname == 'variable':
+            return ('variable', x[1:])
+        elif tokname == 'literal':
+            return ('literal', x[1:-1])
+        elif tokname == 'number':
+            return ('number', x)
+        elif tokname == 'function':
+            self.expect('(')
+            args = []
+            if self.peek() != ')':
+                args.append(self.expr())
+                while self.peek() == ',':
+                    self.next()
+                    args.append(self.expr())
+            self.expect(')')
+            return ('function', x, tuple(args))
+        else:
+            e = self.expr()
+            self.expect(')')
+            return e
+
 def add_prefix(prefix, s):
     "Add `prefix` to all unprefixed names in `s`"
     # tokenize the XPath expression
-    toks = tokens(s)
+    toks = compile(s)
     # add default prefix to unprefixed names
     toks2 = [_add_prefix(prefix, tok) for tok in toks]
     # build a string of the patched expression
@@ -176,3 +423,34 @@ core_functions = [
     'ceiling',
     'round',
     ]
+
+core_function_arity = {
+    'last': (0, 0),
+    'position': (0, 0),
+    'count': (1, 1),
+    'id': (1, 1),
+    'local-name': (0, 1),
+    'namespace-uri': (0, 1),
+    'name': (0, 1),
+    'string': (0, 1),
+    'concat': (2, None),
+    'starts-with': (2, 2),
+    'contains': (2, 2),
+    'substring-before': (2, 2),
+    'substring-after': (2, 2),
+    'substring': (2, 3),
+    'string-length': (0, 1),
+    'normalize-space': (0, 1),
+    'translate': (3, 3),
+    'boolean': (1, 1),
+    'not': (1, 1),
+    'true': (0, 0),
+    'false': (0, 0),
+    'lang': (1, 1),
+    'number': (0, 1),
+    'sum': (1, 1),
+    'floor': (1, 1),
+    'ceiling': (1, 1),
+    'round': (1, 1),
+    }
+"""dict of function name:(min number of args, max number of args or None)"""
@@ -0,0 +1,513 @@
+"""Translation of XML Schema regular expressions into python regexps
+
+YANG patterns use the regular expression language defined in XML
+Schema Part 2, Appendix F.  It differs from python's re module in a
+number of ways; e.g. the expression always matches the whole string,
+'^' and '$' are normal characters, '.' does not match '\\r', the
+multi-character escapes '\\s', '\\w', '\\i' and '\\c' have other
+meanings, and character classes can be subtracted, e.g. [a-z-[aeiou]].
+
+The \\p{..} character categories are taken from the unicodedata module.
+The escapes '\\i' and '\\c' are defined by the large name character
+tables in XML 1.0 second edition, and are not translated.
+"""
+
+import re
+import sys
+import collections
+import unicodedata
+
+try:
+    # python 2
+    _chr = unichr
+    _text_type = unicode
+except NameError:
+    # python 3
+    _chr = chr
+    _text_type = str
+
+cache_size = 1000
+"""the maximum number of patterns in the cache used by compile()"""
+
+_cache = collections.OrderedDict()
+"""dict of pattern:compiled regexp, or (exception class, message)"""
+
+def compile(pattern):
+    """Return a compiled python regexp object for the XML Schema
+    regexp `pattern`.  Use its match() method to test a value.
+
+    Throw SyntaxError if the pattern is not a valid XML Schema regexp,
+    and NotImplementedError if it uses a construct that cannot be
+    translated, e.g. an unknown block name.
+
+    The result is cached, so each pattern is translated once.
+    """
+    res = _cache.pop(pattern, None)
+    if res is None:
+        try:
+            res = re.compile(translate(pattern))
+        except (SyntaxError, NotImplementedError) as e:
+            res = (e.__class__, str(e))
+        if len(_cache) >= cache_size:
+            _cache.popitem(last=False)
+    _cache[pattern] = res
+    if type(res) is tuple:
+        raise res[0](res[1])
+    return res
+
+def translate(pattern):
+    """Return a python regexp which matches the same strings as the XML
+    Schema regexp `pattern`, to be used with re.match().
+
+    Throw SyntaxError or NotImplementedError as compile()."""
+    if not isinstance(pattern, _text_type):
+        pattern = pattern.decode('utf-8')
+    return _Translator(pattern).translate()
+
+def outside_alphabet(pattern):
+    """Return a compiled python regexp which matches any ASCII character
+    that cannot occur in a string matched by the XML Schema regexp
+    `pattern`, or None if any ASCII character can occur.  Use its
+    search() method to reject values without matching the pattern.
+
+    Only ASCII characters are considered, since a class with all other
+    characters outside e.g. \\p{L} is large and slow to match.
+
+    Throw SyntaxError or NotImplementedError as compile()."""
+    if not isinstance(pattern, _text_type):
+        pattern = pattern.decode('utf-8')
+    t = _Translator(pattern)
+    t.translate()
+    outside = [(lo, min(hi, 0x7F)) for (lo, hi) in _complement(t.alphabet)
+               if lo <= 0x7F]
+    if outside == []:
+        return None
+    return re.compile(_class(outside))
+
+_max = sys.maxunicode
+
+# single character escapes
+_single_escapes = {
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+    }
+for _c in '\\|.-^?*+{}()[]':
+    _single_escapes[_c] = _c
+
+# the block names from XML Schema Part 2, Appendix F.1.1
+_blocks = [
+    ('BasicLatin', 0x0000, 0x007F),
+    ('Latin-1Supplement', 0x0080, 0x00FF),
+    ('LatinExtended-A', 0x0100, 0x017F),
+    ('LatinExtended-B', 0x0180, 0x024F),
+    ('IPAExtensions', 0x0250, 0x02AF),
+    ('SpacingModifierLetters', 0x02B0, 0x02FF),
+    ('CombiningDiacriticalMarks', 0x0300, 0x036F),
+    ('Greek', 0x0370, 0x03FF),
+    ('Cyrillic', 0x0400, 0x04FF),
+    ('Armenian', 0x0530, 0x058F),
+    ('Hebrew', 0x0590, 0x05FF),
+    ('Arabic', 0x0600, 0x06FF),
+    ('Syriac', 0x0700, 0x074F),
+    ('Thaana', 0x0780, 0x07BF),
+    ('Devanagari', 0x0900, 0x097F),
+    ('Bengali', 0x0980, 0x09FF),
+    ('Gurmukhi', 0x0A00, 0x0A7F),
+    ('Gujarati', 0x0A80, 0x0AFF),
+    ('Oriya', 0x0B00, 0x0B7F),
+    ('Tamil', 0x0B80, 0x0BFF),
+    ('Telugu', 0x0C00, 0x0C7F),
+    ('Kannada', 0x0C80, 0x0CFF),
+    ('Malayalam', 0x0D00, 0x0D7F),
+    ('Sinhala', 0x0D80, 0x0DFF),
+    ('Thai', 0x0E00, 0x0E7F),
+    ('Lao', 0x0E80, 0x0EFF),
+    ('Tibetan', 0x0F00, 0x0FFF),
+    ('Myanmar', 0x1000, 0x109F),
+    ('Georgian', 0x10A0, 0x10FF),
+    ('HangulJamo', 0x1100, 0x11FF),
+    ('Ethiopic', 0x1200, 0x137F),
+    ('Cherokee', 0x13A0, 0x13FF),
+    ('UnifiedCanadianAboriginalSyllabics', 0x1400, 0x167F),
+    ('Ogham', 0x1680, 0x169F),
+    ('Runic', 0x16A0, 0x16FF),
+    ('Khmer', 0x1780, 0x17FF),
+    ('Mongolian', 0x1800, 0x18AF),
+    ('LatinExtendedAdditional', 0x1E00, 0x1EFF),
+    ('GreekExtended', 0x1F00, 0x1FFF),
+    ('GeneralPunctuation', 0x2000, 0x206F),
+    ('SuperscriptsandSubscripts', 0x2070, 0x209F),
+    ('CurrencySymbols', 0x20A0, 0x20CF),
+    ('CombiningMarksforSymbols', 0x20D0, 0x20FF),
+    ('LetterlikeSymbols', 0x2100, 0x214F),
+    ('NumberForms', 0x2150, 0x218F),
+    ('Arrows', 0x2190, 0x21FF),
+    ('MathematicalOperators', 0x2200, 0x22FF),
+    ('MiscellaneousTechnical', 0x2300, 0x23FF),
+    ('ControlPictures', 0x2400, 0x243F),
+    ('OpticalCharacterRecognition', 0x2440, 0x245F),
+    ('EnclosedAlphanumerics', 0x2460, 0x24FF),
+    ('BoxDrawing', 0x2500, 0x257F),
+    ('BlockElements', 0x2580, 0x259F),
+    ('GeometricShapes', 0x25A0, 0x25FF),
+    ('MiscellaneousSymbols', 0x2600, 0x26FF),
+    ('Dingbats', 0x2700, 0x27BF),
+    ('BraillePatterns', 0x2800, 0x28FF),
+    ('CJKRadicalsSupplement', 0x2E80, 0x2EFF),
+    ('KangxiRadicals', 0x2F00, 0x2FDF),
+    ('IdeographicDescriptionCharacters', 0x2FF0, 0x2FFF),
+    ('CJKSymbolsandPunctuation', 0x3000, 0x303F),
+    ('Hiragana', 0x3040, 0x309F),
+    ('Katakana', 0x30A0, 0x30FF),
+    ('Bopomofo', 0x3100, 0x312F),
+    ('HangulCompatibilityJamo', 0x3130, 0x318F),
+    ('Kanbun', 0x3190, 0x319F),
+    ('BopomofoExtended', 0x31A0, 0x31BF),
+    ('EnclosedCJKLettersandMonths', 0x3200, 0x32FF),
+    ('CJKCompatibility', 0x3300, 0x33FF),
+    ('CJKUnifiedIdeographsExtensionA', 0x3400, 0x4DB5),
+    ('CJKUnifiedIdeographs', 0x4E00, 0x9FFF),
+    ('YiSyllables', 0xA000, 0xA48F),
+    ('YiRadicals', 0xA490, 0xA4CF),
+    ('HangulSyllables', 0xAC00, 0xD7A3),
+    ('HighSurrogates', 0xD800, 0xDB7F),
+    ('HighPrivateUseSurrogates', 0xDB80, 0xDBFF),
+    ('LowSurrogates', 0xDC00, 0xDFFF),
+    ('PrivateUse', 0xE000, 0xF8FF),
+    ('CJKCompatibilityIdeographs', 0xF900, 0xFAFF),
+    ('AlphabeticPresentationForms', 0xFB00, 0xFB4F),
+    ('ArabicPresentationForms-A', 0xFB50, 0xFDFF),
+    ('CombiningHalfMarks', 0xFE20, 0xFE2F),
+    ('CJKCompatibilityForms', 0xFE30, 0xFE4F),
+    ('SmallFormVariants', 0xFE50, 0xFE6F),
+    ('ArabicPresentationForms-B', 0xFE70, 0xFEFE),
+    ('Specials', 0xFEFF, 0xFEFF),
+    ('HalfwidthandFullwidthForms', 0xFF00, 0xFFEF),
+    ('Specials', 0xFFF0, 0xFFFD),
+    ('OldItalic', 0x10300, 0x1032F),
+    ('Gothic', 0x10330, 0x1034F),
+    ('Deseret', 0x10400, 0x1044F),
+    ('ByzantineMusicalSymbols', 0x1D000, 0x1D0FF),
+    ('MusicalSymbols', 0x1D100, 0x1D1FF),
+    ('MathematicalAlphanumericSymbols', 0x1D400, 0x1D7FF),
+    ('CJKUnifiedIdeographsExtensionB', 0x20000, 0x2A6D6),
+    ('CJKCompatibilityIdeographsSupplement', 0x2F800, 0x2FA1F),
+    ('Tags', 0xE0000, 0xE007F),
+    ('PrivateUse', 0xF0000, 0xFFFFD),
+    ('PrivateUse', 0x100000, 0x10FFFD),
+    ]
+
+_categories = ['L', 'Lu', 'Ll', 'Lt', 'Lm', 'Lo',
+               'M', 'Mn', 'Mc', 'Me',
+               'N', 'Nd', 'Nl', 'No',
+               'P', 'Pc', 'Pd', 'Ps', 'Pe', 'Pi', 'Pf', 'Po',
+               'Z', 'Zs', 'Zl', 'Zp',
+               'S', 'Sm', 'Sc', 'Sk', 'So',
+               'C', 'Cc', 'Cf', 'Co', 'Cn']
+
+_category_ranges = {}
+"""dict of tuple of unicode categories:list of ranges, built on first use"""
+
+def _get_category_ranges(*names):
+    """Return the ranges of the characters in any of the categories `names`
+
+    Only the requested categories are built; the result is cached.
+    """
+    key = tuple(sorted(names))
+    ranges = _category_ranges.get(key)
+    if ranges is None:
+        ranges = _category_ranges[key] = _scan_categories(key)
+    return ranges
+
+def _scan_categories(names):
+    # a one-letter name stands for all its two-letter categories; 'Cs'
+    # (surrogates) is not a valid property name, but is part of 'C'.
+    cats = set(cat for cat in _categories + ['Cs']
+               if len(cat) == 2 and (cat in names or cat[0] in names))
+    # only the planes with assigned characters are scanned; the
+    # characters in between are unassigned, and the last two planes
+    # are private use (except for the two noncharacters at the end of
+    # each plane).
+    spans = [(0, 0x3FFFF, None), (0x40000, 0xDFFFF, 'Cn'),
+             (0xE0000, 0xEFFFF, None)]
+    if _max > 0xFFFF:
+        spans.extend([(0xF0000, 0xFFFFD, 'Co'), (0xFFFFE, 0xFFFFF, 'Cn'),
+                      (0x100000, 0x10FFFD, 'Co'),
+                      (0x10FFFE, 0x10FFFF, 'Cn')])
+    res = []
+    for (lo, hi, cat) in spans:
+        if lo > _max:
+            break
+        hi = min(hi, _max)
+        if cat is not None:
+            if cat in cats:
+                res.append((lo, hi))
+            continue
+        # the per-character work is done by builtins; the runs of
+        # matching characters are then found by the regexp engine
+        chars = map(_chr, range(lo, hi + 1))
+        hits = bytearray(map(cats.__contains__,
+                             map(unicodedata.category, chars)))
+        for m in re.finditer(b'\x01+', hits):
+            res.append((lo + m.start(), lo + m.end() - 1))
+    return _normalize(res)
+
+def _normalize(ranges):
+    """Return a sorted list of non-overlapping ranges"""
+    res = []
+    for (lo, hi) in sorted(ranges):
+        if res and lo <= res[-1][1] + 1:
+            if hi > res[-1][1]:
+                res[-1] = (res[-1][0], hi)
+        else:
+            res.append((lo, hi))
+    return res
+
+def _complement(ranges):
+    res = []
+    next = 0
+    for (lo, hi) in _normalize(ranges):
+        if lo > next:
+            res.append((next, lo - 1))
+        next = hi + 1
+    if next <= _max:
+        res.append((next, _max))
+    return res
+
+def _multi_escape(c):
+    """Return the ranges for the multi-character escape `c`, or None"""
+    lc = c.lower()
+    if lc == 's':
+        ranges = [(0x9, 0xA), (0xD, 0xD), (0x20, 0x20)]
+    elif lc == 'd':
+        ranges = _get_category_ranges('Nd')
+    elif lc == 'w':
+        ranges = _complement(_get_category_ranges('P', 'Z', 'C'))
+    elif lc in ('i', 'c'):
+        raise NotImplementedError('\\%s is not supported' % c)
+    else:
+        return None
+    ranges = [(lo, min(hi, _max)) for (lo, hi) in ranges if lo <= _max]
+    if c != lc:
+        return _complement(ranges)
+    return _normalize(ranges)
+
+def _property_ranges(name):
+    if name.startswith('Is'):
+        ranges = [(lo, hi) for (block, lo, hi) in _blocks
+                  if block == name[2:] and lo <= _max]
+        if ranges == []:
+            raise NotImplementedError('unknown block name %s' % name)
+        return [(lo, min(hi, _max)) for (lo, hi) in ranges]
+    elif name in _categories:
+        return _get_category_ranges(name)
+    raise SyntaxError('unknown character property %s' % name)
+
+def _class_char(i):
+    c = _chr(i)
+    if i < 0x80 and not c.isalnum():
+        return '\\' + c
+    return c
+
+def _class(ranges):
+    """Return a python regexp which matches one character in `ranges`"""
+    if ranges == []:
+        return '(?!)'
+    res = ['[']
+    for (lo, hi) in ranges:
+        res.append(_class_char(lo))
+        if hi > lo:
+            if hi > lo + 1:
+                res.append('-')
+            res.append(_class_char(hi))
+    res.append(']')
+    return ''.join(res)
+
+_any_char = _class(_complement([(0xA, 0xA), (0xD, 0xD)]))
+
+class _Translator(object):
+    def __init__(self, pattern):
+        self.s = pattern
+        self.i = 0
+        self.alphabet = []
+        """ranges of all characters in the pattern; a superset of the
+        characters which can occur in a matched string"""
+
+    def translate(self):
+        res = self.regexp()
+        if self.i < len(self.s):
+            # an unbalanced ')'
+            self.error('unexpected )')
+        return '(?:' + res + ')\\Z'
+
+    def error(self, msg):
+        raise SyntaxError('%s at position %s' % (msg, self.i + 1))
+
+    def peek(self):
+        if self.i < len(self.s):
+            return self.s[self.i]
+        return None
+
+    def next(self):
+        c = self.peek()
+        if c is None:
+            self.error('unexpected end of pattern')
+        self.i += 1
+        return c
+
+    def regexp(self):
+        branches = [self.branch()]
+        while self.peek() == '|':
+            self.i += 1
+            branches.append(self.branch())
+        return '|'.join(branches)
+
+    def branch(self):
+        res = []
+        while self.peek() not in (None, '|', ')'):
+            res.append(self.atom())
+            res.append(self.quantifier())
+        return ''.join(res)
+
+    def atom(self):
+        c = self.next()
+        if c == '(':
+            res = self.regexp()
+            if self.peek() != ')':
+                self.error('missing )')
+            self.i += 1
+            return '(?:' + res + ')'
+        elif c == '[':
+            return self.char_class()
+        elif c == '\\':
+            (char, ranges) = self.escape()
+            if ranges is not None:
+                self.alphabet.extend(ranges)
+                return _class(ranges)
+            self.alphabet.append((ord(char), ord(char)))
+            return re.escape(char)
+        elif c == '.':
+            self.alphabet.extend(_complement([(0xA, 0xA), (0xD, 0xD)]))
+            return _any_char
+        elif c in '?*+{}]':
+            self.i -= 1
+            self.error('unexpected %s' % c)
+        self.alphabet.append((ord(c), ord(c)))
+        return re.escape(c)
+
+    def quantifier(self):
+        c = self.peek()
+        if c in ('?', '*', '+'):
+            self.i += 1
+            return c
+        elif c == '{':
+            start = self.i
+            self.i += 1
+            lo = self.number()
+            hi = lo
+            if self.peek() == ',':
+                self.i += 1
+                if self.peek() == '}':
+                    hi = None
+                else:
+                    hi = self.number()
+            if self.peek() != '}':
+                self.error('bad quantifier')
+            self.i += 1
+            if hi is not None and int(hi) < int(lo):
+                self.i = start
+                self.error('bad quantifier')
+            return self.s[start:self.i]
+        return ''
+
+    def number(self):
+        start = self.i
+        while self.peek() is not None and self.peek() in '0123456789':
+            self.i += 1
+        if self.i == start:
+            self.error('expected a number')
+        return self.s[start:self.i]
+
+    def escape(self):
+        """Parse the escape after a backslash.  Return (char, None) for a
+        single character escape and (None, ranges) otherwise."""
+        c = self.next()
+        if c in _single_escapes:
+            return (_single_escapes[c], None)
+        elif c in ('p', 'P'):
+            if self.peek() != '{':
+                self.error('expected {')
+            end = self.s.find('}', self.i)
+            if end == -1:
+                self.error('missing }')
+            name = self.s[self.i + 1:end]
+            self.i = end + 1
+            ranges = _property_ranges(name)
+            if c == 'P':
+                ranges = _complement(ranges)
+            return (None, ranges)
+        ranges = _multi_escape(c)
+        if ranges is None:
+            self.i -= 2
+            self.error('unknown escape \\%s' % c)
+        return (None, ranges)
+
+    def char_class(self):
+        """Parse a character class after '['"""
+        negative = False
+        if self.peek() == '^':
+            self.i += 1
+            negative = True
+        ranges = []
+        first = True
+        subtraction = None
+        while True:
+            c = self.next()
+            if c == ']' and not first:
+                break
+            elif c == '-' and self.peek() == '[' and not first:
+                self.i += 1
+                subtraction = self.char_class()
+                if self.next() != ']':
+                    self.i -= 1
+                    self.error('expected ]')
+                break
+            elif c == '-' and not first and self.peek() != ']':
+                self.i -= 1
+                self.error('unexpected -')
+            lo = self.class_char(c)
+            first = False
+            if type(lo) is list:
+                ranges.extend(lo)
+            elif (self.peek() == '-' and
+                  self.s[self.i + 1:self.i + 2] not in (']', '[')):
+                self.i += 1
+                hi = self.class_char(self.next())
+                if type(hi) is list or hi < lo:
+                    self.i -= 1
+                    self.error('bad character range')
+                ranges.append((lo, hi))
+            else:
+                ranges.append((lo, lo))
+        ranges = _normalize(ranges)
+        if negative:
+            ranges = _complement(ranges)
+        self.alphabet.extend(ranges)
+        res = _class(ranges)
+        if subtraction is not None:
+            res = '(?:(?!' + subtraction + ')' + res + ')'
+        return res
+
+    def class_char(self, c):
+        """Return the code point of the character `c` in a character class,
+        or a list of ranges for a multi-character escape"""
+        if c == '\\':
+            (char, ranges) = self.escape()
+            if ranges is not None:
+                return ranges
+            c = char
+        elif c == '[':
+            self.i -= 1
+            self.error('unexpected [')
+        return ord(c)
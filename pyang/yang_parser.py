@@ -6,123 +6,206 @@ from . import error
 from . import util
 from . import statements
 from . import syntax
-import collections
+import bisect
 import sys
+import re
+
+_re_break = re.compile(u'\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+_re_ws = re.compile(r"\s*", re.U)
+# whitespace, line comments and block comments; note that "/*/" is a
+# complete block comment
+_re_ws_cmt = re.compile(u'(?:\\s+|//[^\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]*|'
+                        u'/(?=\\*).*?\\*/)*', re.S | re.U)
+_re_unquoted_tok = re.compile(r"(?:[^\s;{}/*]|/(?![/*])|\*(?!/))*", re.U)
+# the same, for byte strings in python 2
+_re_break_b = re.compile(r"\r\n|[\n\r]")
+_re_ws_b = re.compile(r"\s*")
+_re_ws_cmt_b = re.compile(r"(?:\s+|//[^\n\r]*|/(?=\*).*?\*/)*", re.S)
+_re_unquoted_tok_b = re.compile(r"(?:[^\s;{}/*]|/(?![/*])|\*(?!/))*")
 
 class YangTokenizer(object):
+    """Splits YANG text into tokens.
+
+    The text is scanned by offset, without copying the remaining text
+    for each token.  The line number in `pos` is computed from the
+    offset only when update_pos() is called, which must be done before
+    `pos` is used.
+    """
+
     def __init__(self, text, pos, errors,
                  max_line_len=None, keep_comments=False):
-        self.lines = collections.deque(text.splitlines(True))
+        self.text = text
+        self.end = len(text)
         self.pos = pos
-        self.buf = ''
-        self.offset = 0
-        """Position on line.  Used to remove leading whitespace from strings."""
+        self.cur = 0
+        """Offset of the next character to scan."""
+
+        if isinstance(text, type(u'')):
+            (re_break, self.re_ws, re_ws_cmt, self.re_unquoted) = \
+                (_re_break, _re_ws, _re_ws_cmt, _re_unquoted_tok)
+        else:
+            (re_break, self.re_ws, re_ws_cmt, self.re_unquoted) = \
+                (_re_break_b, _re_ws_b, _re_ws_cmt_b, _re_unquoted_tok_b)
+        if keep_comments:
+            self.re_skip = self.re_ws
+        else:
+            # do not keep comments in the syntax tree
+            self.re_skip = re_ws_cmt
+        self.starts = [0]
+        """Offset of the first character of each line."""
+        self.starts.extend([m.end() for m in re_break.finditer(text)])
+        if self.starts[-1] == self.end and self.end > 0:
+            del self.starts[-1]
+        if self.end == 0:
+            self.nlines = 0
+        else:
+            self.nlines = len(self.starts)
+
+        self.col_base = (0, 0)
+        """(line, offset) of the start of the line used to compute the
+        column of a string, if it is not the start of the line."""
 
         self.max_line_len = max_line_len
         if self.max_line_len == 0:
             self.max_line_len = None
+        self.long_lines = []
+        """(line, length) of each line longer than max_line_len, reported
+        when the line is reached."""
+        if self.max_line_len is not None:
+            self._find_long_lines()
+        self.next_long = 0
         self.keep_comments = keep_comments
         self.errors = errors
         self.strict_quoting = False
 
-    def readline(self):
-        if len(self.lines) == 0:
-            raise error.Eof
-        self.buf = self.lines.popleft()
-        self.pos.line += 1
-        self.offset = 0
-        if self.max_line_len is not None:
-            curlen = len(self.buf)
-            if curlen >= 1 and self.buf[-1] == '\n':
-                if curlen >= 2 and self.buf[-2] == '\r':
+    def _find_long_lines(self):
+        text = self.text
+        starts = self.starts + [self.end]
+        for n in range(self.nlines):
+            (start, end) = (starts[n], starts[n+1])
+            if end - start <= self.max_line_len:
+                continue
+            curlen = end - start
+            if text[end-1] == '\n':
+                if curlen >= 2 and text[end-2] == '\r':
                     curlen -= 2
                 else:
                     curlen -= 1
             if curlen > self.max_line_len:
-                error.err_add(self.errors, self.pos, 'LONG_LINE',
-                              (curlen, self.max_line_len))
+                self.long_lines.append((n + 1, curlen))
+
+    def _line(self, offset):
+        line = bisect.bisect_right(self.starts, offset)
+        if line > self.nlines:
+            line = self.nlines
+        return line
+
+    def _line_end(self, line):
+        """Return the offset after the end of `line`"""
+        if line < len(self.starts):
+            return self.starts[line]
+        return self.end
 
-    def set_buf(self, i):
-        self.offset = self.offset + i
-        self.buf = self.buf[i:]
+    def update_pos(self):
+        """Set the line in `pos` to the line of the next character, and
+        report the long lines up to that line."""
+        line = self._line(self.cur)
+        while (self.next_long < len(self.long_lines) and
+               self.long_lines[self.next_long][0] <= line):
+            (self.pos.line, curlen) = self.long_lines[self.next_long]
+            error.err_add(self.errors, self.pos, 'LONG_LINE',
+                          (curlen, self.max_line_len))
+            self.next_long += 1
+        self.pos.line = line
+
+    def _eof(self):
+        self.cur = self.end
+        self.update_pos()
+        raise error.Eof
+
+    def _column(self):
+        """Return the position of the next character on its line"""
+        line = self._line(self.cur)
+        if self.col_base[0] == line:
+            return self.cur - self.col_base[1]
+        return self.cur - self.starts[line - 1]
 
     def skip(self):
-        """Skip whitespace and count position"""
-        buflen = len(self.buf)
-
-        while True:
-            self.buf = self.buf.lstrip()
-            if self.buf == '':
-                self.readline()
-                buflen = len(self.buf)
-            else:
-                self.offset += (buflen - len(self.buf))
-                break
-
-        # do not keep comments in the syntax tree
-        if not self.keep_comments:
-            # skip line comment
-            if self.buf[0] == '/':
-                if self.buf[1] == '/':
-                    self.readline()
-                    return self.skip()
-            # skip block comment
-                elif self.buf[1] == '*':
-                    i = self.buf.find('*/')
-                    while i == -1:
-                        self.readline()
-                        i = self.buf.find('*/')
-                    self.set_buf(i+2)
-                    return self.skip()
+        """Skip whitespace and comments"""
+        i = self.re_skip.match(self.text, self.cur).end()
+        if i == self.end:
+            self._eof()
+        self.cur = i
+        if (not self.keep_comments and self.text[i] == '/' and
+            self.text[i+1] == '*'):
+            # unterminated block comment
+            self._eof()
 
     def get_comment(self):
         """ret: string()"""
         self.skip()
-        offset = self.offset
-        m = syntax.re_comment.match(self.buf)
+        text = self.text
+        offset = self._column()
+        line = self._line(self.cur)
+        line_end = self._line_end(line)
+        m = syntax.re_comment.match(text, self.cur, line_end)
         if m == None:
             return None
         else:
             cmt = m.group(0)
-            self.set_buf(m.end())
+            self.cur = m.end()
             # look for a multiline comment
             if cmt[:2] == '/*' and cmt[-2:] != '*/':
-                i = self.buf.find('*/')
+                bufstart = self.cur
+                buf = text[bufstart:line_end]
+                i = buf.find('*/')
                 while i == -1:
-                    self.readline()
+                    if line_end == self.end:
+                        self._eof()
+                    line += 1
+                    line_start = line_end
+                    line_end = self._line_end(line)
+                    buf = text[line_start:line_end]
                     # remove at most the same number of whitespace as
                     # the comment start was indented
                     j = 0
                     while (j < offset and
-                           self.buf[j].isspace()):
+                           buf[j].isspace()):
                         j = j + 1
-                    self.buf = self.buf[j:]
-                    cmt += '\n'+self.buf.replace('\n','')
-                    i = self.buf.find('*/')
-                self.set_buf(i+2)
+                    buf = buf[j:]
+                    bufstart = line_start + j
+                    self.col_base = (line, bufstart)
+                    cmt += '\n'+buf.replace('\n','')
+                    i = buf.find('*/')
+                self.cur = bufstart + i + 2
             self.skip()
             return cmt
 
     def get_keyword(self):
         """ret: identifier | (prefix, identifier)"""
         self.skip()
+        text = self.text
 
-        m = syntax.re_keyword.match(self.buf)
+        m = syntax.re_keyword.match(text, self.cur)
         if m == None:
+            self.update_pos()
             error.err_add(self.errors, self.pos,
-                          'SYNTAX_ERROR', 'illegal keyword: ' + self.buf)
+                          'SYNTAX_ERROR', 'illegal keyword: ' +
+                          text[self.cur:self._line_end(self.pos.line)])
             raise error.Abort
         else:
-            self.set_buf(m.end())
+            i = self.cur = m.end()
             # check the separator
-            if (self.buf[0].isspace() or
-                (self.buf[0] == '/' and self.buf[1] in ('/', '*')) or
-                (self.buf[0] in (';','{'))):
+            if (text[i].isspace() or
+                (text[i] == '/' and text[i+1] in ('/', '*')) or
+                (text[i] in (';','{'))):
                 pass
             else:
+                self.update_pos()
+                line_end = self._line_end(self.pos.line)
                 error.err_add(self.errors, self.pos,
                               'SYNTAX_ERROR', 'expected separator, got: "' +
-                              self.buf[:6] + '..."')
+                              text[i:min(i+6, line_end)] + '..."')
                 raise error.Abort
 
             if m.group(2) == None: # no prefix
@@ -130,6 +213,36 @@ class YangTokenizer(object):
             else:
                 return (m.group(2), m.group(3))
 
+    def skip_quoted_string(self):
+        """Skip a quoted string which is not concatenated with another.
+
+        ret: (start, end, indent), where `start` and `end` are the
+        offsets of the string, including the quotes, and `indent` is
+        the column of the first quote, or None if the string must be
+        parsed with get_string()
+        """
+        self.skip()
+        text = self.text
+        start = self.cur
+        if text[start] == '"':
+            m = _re_dquoted.match(text, start)
+        elif text[start] == "'":
+            m = _re_squoted.match(text, start)
+        else:
+            return None
+        if m is None:
+            return None
+        end = m.end()
+        if self.strict_quoting and text.find('\\', start, end) != -1:
+            # report illegal escapes now
+            return None
+        indent = self._column()
+        self.cur = end
+        if self.peek() == '+':
+            self.cur = start
+            return None
+        return (start, end, indent)
+
     def peek(self):
         """Return next real character in input stream.
 
@@ -137,107 +250,152 @@ class YangTokenizer(object):
         without consuming it.  Use skip_tok() to consume the characater.
         """
         self.skip()
-        try:
-            return self.buf[0]
-        except:
-            raise error.Eof
+        return self.text[self.cur]
 
     def skip_tok(self):
         self.skip()
-        self.set_buf(1)
+        self.cur += 1
 
     def get_string(self, need_quote=False):
         """ret: string"""
         self.skip()
+        text = self.text
 
-        if self.buf[0] == ';' or self.buf[0] == '{' or self.buf[0] == '}':
+        if text[self.cur] in (';', '{', '}'):
+            self.update_pos()
             error.err_add(self.errors, self.pos,
-                          'EXPECTED_ARGUMENT', self.buf[0])
+                          'EXPECTED_ARGUMENT', text[self.cur])
             raise error.Abort
-        if self.buf[0] == '"' or self.buf[0] == "'":
+        if text[self.cur] == '"' or text[self.cur] == "'":
             # for double-quoted string,  loop over string and translate
             # escaped characters.  also strip leading whitespace as
             # necessary.
             # for single-quoted string, keep going until end quote is found.
-            quote_char = self.buf[0]
+            quote_char = text[self.cur]
             # collect output in strs (list of strings)
             strs = []
             # remember position of " character
-            indentpos = self.offset
-            i = 1
+            indentpos = self._column()
+            line = self._line(self.cur)
+            line_end = self._line_end(line)
+            i = self.cur + 1
+            start = i
             while True:
-                buflen = len(self.buf)
-                start = i
-                while i < buflen:
-                    if self.buf[i] == quote_char:
-                        # end-of-string; copy the buf to output
-                        strs.append(self.buf[start:i])
-                        # and trim buf
-                        self.set_buf(i+1)
-                        # check for '+' operator
-                        self.skip()
-                        if self.buf[0] == '+':
-                            self.set_buf(1)
-                            self.skip()
-                            nstr = self.get_string(need_quote=True)
-                            if (type(nstr) != type(u'')):
-                                error.err_add(self.errors, self.pos,
-                                              'EXPECTED_QUOTED_STRING', ())
-                                raise error.Abort
-                            strs.append(nstr)
-                        return u''.join(strs)
-                    elif (quote_char == '"' and
-                          self.buf[i] == '\\' and i < (buflen-1)):
+                # find the end quote, or an escape character, on this line
+                q = text.find(quote_char, i, line_end)
+                if quote_char == '"':
+                    b = text.find('\\', i, line_end if q == -1 else q)
+                else:
+                    b = -1
+                if b != -1:
+                    i = b + 1
+                    if b < (line_end-1):
                         # check for special characters
                         special = None
-                        if self.buf[i+1] == 'n':
+                        if text[i] == 'n':
                             special = '\n'
-                        elif self.buf[i+1] == 't':
+                        elif text[i] == 't':
                             special = '\t'
-                        elif self.buf[i+1] == '\"':
+                        elif text[i] == '\"':
                             special = '\"'
-                        elif self.buf[i+1] == '\\':
+                        elif text[i] == '\\':
                             special = '\\'
                         elif self.strict_quoting:
+                            self.cur = b
+                            self.update_pos()
                             error.err_add(self.errors, self.pos,
-                                          'ILLEGAL_ESCAPE', self.buf[i+1])
+                                          'ILLEGAL_ESCAPE', text[i])
                             raise error.Abort
 
                         if special != None:
-                            strs.append(self.buf[start:i])
+                            strs.append(text[start:b])
                             strs.append(special)
-                            i = i + 1
-                            start = i + 1
-                    i = i + 1
-                # end-of-line, keep going
-                strs.append(self.buf[start:i])
-                self.readline()
-                i = 0
-                if quote_char == '"':
-                    # skip whitespace used for indentation
-                    buflen = len(self.buf)
-                    while (i < buflen and self.buf[i].isspace() and
-                           i <= indentpos):
-                        i = i + 1
-                    if i == buflen:
-                        # whitespace only on this line; keep it as is
-                        i = 0
+                            i = start = b + 2
+                elif q != -1:
+                    # end-of-string; copy the text to output
+                    strs.append(text[start:q])
+                    self.cur = q + 1
+                    # check for '+' operator
+                    self.skip()
+                    if text[self.cur] == '+':
+                        self.cur += 1
+                        self.skip()
+                        nstr = self.get_string(need_quote=True)
+                        if (type(nstr) != type(u'')):
+                            self.update_pos()
+                            error.err_add(self.errors, self.pos,
+                                          'EXPECTED_QUOTED_STRING', ())
+                            raise error.Abort
+                        strs.append(nstr)
+                    return u''.join(strs)
+                else:
+                    # end-of-line, keep going
+                    strs.append(text[start:line_end])
+                    if line_end == self.end:
+                        self._eof()
+                    line += 1
+                    line_start = line_end
+                    line_end = self._line_end(line)
+                    i = line_start
+                    if quote_char == '"':
+                        # skip whitespace used for indentation
+                        i = self.re_ws.match(
+                            text, line_start,
+                            min(line_end, line_start + indentpos + 1)).end()
+                        if i == line_end:
+                            # whitespace only on this line; keep it as is
+                            i = line_start
+                    start = i
         elif need_quote == True:
+            self.update_pos()
             error.err_add(self.errors, self.pos, 'EXPECTED_QUOTED_STRING', ())
             raise error.Abort
         else:
             # unquoted string
-            buflen = len(self.buf)
-            i = 0
-            while i < buflen:
-                if (self.buf[i].isspace() or self.buf[i] == ';' or
-                    self.buf[i] == '{' or self.buf[i] == '}' or
-                    self.buf[i:i+2] == '//' or self.buf[i:i+2] == '/*' or
-                    self.buf[i:i+2] == '*/'):
-                    res = self.buf[:i]
-                    self.set_buf(i)
-                    return res
-                i = i + 1
+            start = self.cur
+            i = self.re_unquoted.match(text, start).end()
+            if i == self.end:
+                # the string is not terminated
+                return None
+            self.cur = i
+            return text[start:i]
+
+_lazy_text_keywords = ('description', 'reference', 'organization', 'contact')
+
+class _LazyArg(object):
+    """Parses the argument of a _LazyTextStatement when it is first used.
+
+    This is a non-data descriptor, so once the argument is stored in
+    the statement, it is used directly.
+    """
+    def __get__(self, stmt, cls):
+        if stmt is None:
+            return self
+        stmt.arg = parse_lazy_arg(stmt.lazy_arg)
+        stmt.lazy_arg = None
+        return stmt.arg
+
+def parse_lazy_arg(lazy_arg):
+    """Return the string in `lazy_arg`, the (text, start, end, indent)
+    of a quoted string in the source text"""
+    (text, start, end, indent) = lazy_arg
+    buf = ' ' * indent + text[start:end] + ';'
+    tokenizer = YangTokenizer(buf, error.Position(None), [])
+    tokenizer.cur = indent
+    return tokenizer.get_string()
+
+class _LazyTextStatement(statements.Statement):
+    """A statement with a quoted string argument which is parsed from
+    the source text when it is first used."""
+
+    arg = _LazyArg()
+
+    def __init__(self, top, parent, pos, keyword, lazy_arg):
+        statements.Statement.__init__(self, top, parent, pos, keyword)
+        del self.arg
+        self.lazy_arg = lazy_arg
+        """(text, start, end, indent) of the argument in the source text,
+        or None when the argument has been parsed"""
 
 class YangParser(object):
     def __init__(self, extra={}):
@@ -252,6 +410,7 @@ class YangParser(object):
         self.ctx = ctx
         self.pos = error.Position(ref)
         self.top = None
+        self.lazy_text = ctx.lazy_text and not ctx.keep_comments
 
         try:
             self.tokenizer = YangTokenizer(text, self.pos, ctx.errors,
@@ -269,6 +428,7 @@ class YangParser(object):
             return stmt
         except:
             pass
+        self.tokenizer.update_pos()
         error.err_add(self.ctx.errors, self.pos, 'TRAILING_GARBAGE', ())
         return None
 
@@ -279,6 +439,7 @@ class YangParser(object):
         if self.ctx.keep_comments:
            cmt = self.tokenizer.get_comment()
            if cmt != None:
+              self.tokenizer.update_pos()
               stmt = statements.Statement(self.top,
                                           parent,
                                           self.pos,
@@ -289,14 +450,25 @@ class YangParser(object):
         keywd = self.tokenizer.get_keyword()
         # check for argument
         tok = self.tokenizer.peek()
-        if tok == '{' or tok == ';':
-            arg = None
-        else:
-            arg = self.tokenizer.get_string()
+        arg = None
+        lazy = None
+        if tok != '{' and tok != ';':
+            if self.lazy_text and keywd in _lazy_text_keywords:
+                # the argument is parsed when it is used
+                lazy = self.tokenizer.skip_quoted_string()
+            if lazy is None:
+                arg = self.tokenizer.get_string()
         # check for YANG 1.1
         if keywd == 'yang-version' and arg == '1.1':
             self.tokenizer.strict_quoting = True
-        stmt = statements.Statement(self.top, parent, self.pos, keywd, arg)
+        self.tokenizer.update_pos()
+        if lazy is None:
+            stmt = statements.Statement(self.top, parent, self.pos, keywd, arg)
+        else:
+            (start, end, indent) = lazy
+            stmt = _LazyTextStatement(self.top, parent, self.pos, keywd,
+                                      (self.tokenizer.text, start, end,
+                                       indent))
         if self.top is None:
             self.pos.top = stmt
             self.top = stmt
@@ -312,11 +484,161 @@ class YangParser(object):
         elif tok == ';':
             self.tokenizer.skip_tok() # skip the ';'
         else:
+            self.tokenizer.update_pos()
             error.err_add(self.ctx.errors, self.pos, 'INCOMPLETE_STATEMENT',
                           (keywd, tok))
             raise error.Abort
         return stmt
 
+### Header scanning
+
+_re_skip = re.compile(r"(?:\s+|//[^\r\n]*|/\*.*?\*/)*", re.S | re.U)
+_re_dquoted = re.compile(r'"((?:[^"\\]|\\.)*)"', re.S)
+_re_squoted = re.compile(r"'([^']*)'")
+_re_unquoted = re.compile(r"(?:[^\s;{}/*]|/(?![/*])|\*(?!/))+", re.U)
+_re_escape = re.compile(r'\\([nt"\\])')
+_escapes = {'n': '\n', 't': '\t', '"': '"', '\\': '\\'}
+
+def peek_header(text):
+    """Scan the header of the YANG module in `text` without parsing it.
+
+    Only the top-level statements up to the first body statement are
+    looked at, which means that the header and all revision statements
+    are found in a module with correct statement order.  No statement
+    tree is built, and substatements are skipped without looking at
+    their arguments.
+
+    Returns a dict which maps 'module' or 'submodule' to a list with
+    the name of the module, and each keyword in `syntax.header_keywords`
+    found to the list of arguments of these statements.  Imports and
+    includes of a specific revision are also listed under
+    'import-revision-date' and 'include-revision-date', as tuples
+    (modulename, revision).  Returns None if the text could not be
+    scanned; the module must then be parsed.
+    """
+    try:
+        return _peek_header(text)
+    except (ValueError, IndexError):
+        return None
+
+def _peek_header(text):
+    pos = _re_skip.match(text, 0).end()
+    (keyword, pos) = _scan_keyword(text, pos)
+    if keyword != 'module' and keyword != 'submodule':
+        raise ValueError
+    (arg, pos) = _scan_string(text, pos)
+    res = {keyword: [arg]}
+    if text[pos] != '{':
+        raise ValueError
+    pos += 1
+    while True:
+        pos = _re_skip.match(text, pos).end()
+        if text[pos] == '}':
+            return res
+        (keyword, pos) = _scan_keyword(text, pos)
+        if keyword not in syntax.header_keywords and ':' not in keyword:
+            # the first body statement; the header is done
+            return res
+        if text[pos] == ';' or text[pos] == '{':
+            arg = None
+        else:
+            (arg, pos) = _scan_string(text, pos)
+        if keyword in syntax.header_keywords:
+            res.setdefault(keyword, []).append(arg)
+        if text[pos] == ';':
+            pos += 1
+        elif text[pos] == '{' and keyword in ('import', 'include'):
+            (rev, pos) = _scan_revision_date(text, pos + 1)
+            if rev is not None:
+                res.setdefault(keyword + '-revision-date', []).append(
+                    (arg, rev))
+        elif text[pos] == '{':
+            pos = _skip_block(text, pos + 1)
+        else:
+            raise ValueError
+
+def _scan_revision_date(text, pos):
+    """Return the argument of the revision-date statement in the block
+    of an import or include statement which starts at `pos`, or None,
+    and the position after the block"""
+    rev = None
+    while True:
+        pos = _re_skip.match(text, pos).end()
+        if text[pos] == '}':
+            return (rev, pos + 1)
+        (keyword, pos) = _scan_keyword(text, pos)
+        if text[pos] == ';' or text[pos] == '{':
+            arg = None
+        else:
+            (arg, pos) = _scan_string(text, pos)
+        if keyword == 'revision-date':
+            rev = arg
+        if text[pos] == ';':
+            pos += 1
+        elif text[pos] == '{':
+            pos = _skip_block(text, pos + 1)
+        else:
+            raise ValueError
+
+def _scan_keyword(text, pos):
+    m = syntax.re_keyword.match(text, pos)
+    if m is None:
+        raise ValueError
+    return (m.group(0), _re_skip.match(text, m.end()).end())
+
+def _scan_string(text, pos):
+    """Return the argument starting at `pos`, and the position of the
+    next token"""
+    if text[pos] != '"' and text[pos] != "'":
+        m = _re_unquoted.match(text, pos)
+        if m is None:
+            raise ValueError
+        return (m.group(0), _re_skip.match(text, m.end()).end())
+    strs = []
+    while True:
+        if text[pos] == '"':
+            m = _re_dquoted.match(text, pos)
+            if m is None:
+                raise ValueError
+            strs.append(_re_escape.sub(lambda e: _escapes[e.group(1)],
+                                       m.group(1)))
+        else:
+            m = _re_squoted.match(text, pos)
+            if m is None:
+                raise ValueError
+            strs.append(m.group(1))
+        pos = _re_skip.match(text, m.end()).end()
+        if text[pos] != '+':
+            return (u''.join(strs), pos)
+        pos = _re_skip.match(text, pos + 1).end()
+        if text[pos] != '"' and text[pos] != "'":
+            raise ValueError
+
+def _skip_block(text, pos):
+    """Return the position after the '}' which ends the block that
+    starts at `pos`"""
+    depth = 1
+    while True:
+        pos = _re_skip.match(text, pos).end()
+        c = text[pos]
+        if c == '}':
+            depth -= 1
+            pos += 1
+            if depth == 0:
+                return pos
+        elif c == '{':
+            depth += 1
+            pos += 1
+        elif c == ';':
+            pos += 1
+        elif c == '"' or c == "'":
+            (_arg, pos) = _scan_string(text, pos)
+        else:
+            m = _re_unquoted.match(text, pos)
+            if m is None:
+                raise ValueError
+            pos = m.end()
+
 # FIXME: tmp debug
 import sys
 
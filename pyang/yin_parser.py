@@ -389,3 +389,55 @@ class YinParser(object):
                     return r
         return None
 
+
+class _HeaderDone(Exception):
+    pass
+
+def peek_header(text):
+    """Scan the header of the YIN module in `text` without parsing it.
+
+    Returns a dict in the same format as yang_parser.peek_header(), or
+    None if the text could not be scanned.  Only statements with their
+    argument in an attribute are recorded.
+    """
+    res = {}
+    depth = [0]
+    # the keyword and argument of the current header statement
+    stmt = [None, None]
+    def start_element(name, attrs):
+        depth[0] += 1
+        (ns, local_name) = YinParser.split_qname(name)
+        if depth[0] == 1:
+            if (ns != yin_namespace or
+                local_name not in ('module', 'submodule')):
+                raise ValueError
+        elif ns != yin_namespace:
+            return
+        elif depth[0] == 3:
+            if (local_name == 'revision-date' and
+                stmt[0] in ('import', 'include')):
+                res.setdefault(stmt[0] + '-revision-date', []).append(
+                    (stmt[1], attrs.get('date')))
+            return
+        elif depth[0] > 2:
+            return
+        elif local_name not in syntax.header_keywords:
+            # the first body statement; the header is done
+            raise _HeaderDone
+        (argname, arg_is_elem) = syntax.yin_map[local_name]
+        stmt[:] = [local_name, None]
+        if arg_is_elem == False:
+            stmt[1] = attrs.get(argname)
+            res.setdefault(local_name, []).append(stmt[1])
+    def end_element(name):
+        depth[0] -= 1
+    parser = expat.ParserCreate("UTF-8", YinParser.ns_sep)
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    try:
+        parser.Parse(text.encode('utf-8'), True)
+    except _HeaderDone:
+        pass
+    except (ValueError, expat.ExpatError):
+        return None
+    return res
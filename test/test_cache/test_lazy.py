@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+# check that the parse cache keeps the arguments which are parsed when
+# they are used (ctx.lazy_text)
+
+import unittest
+
+import pyang
+from pyang import cache
+
+MODULE = '''
+module c {
+  namespace "urn:c";
+  prefix c;
+
+  organization "example";
+  description
+    "A multi-line
+     description.";
+
+  leaf x {
+    type string;
+    reference 'RFC 7950';
+  }
+}
+'''
+
+class TestLazyText(unittest.TestCase):
+    def setUp(self):
+        self.cache = cache.MemoryParseCache()
+
+    def add_module(self, lazy_text):
+        ctx = pyang.Context(pyang.FileRepository(use_env=False))
+        ctx.lazy_text = lazy_text
+        ctx.parse_cache = self.cache
+        return ctx.add_module('c.yang', MODULE)
+
+    def texts(self, m):
+        return [m.search_one('organization'), m.search_one('description'),
+                m.search_one('leaf').search_one('reference')]
+
+    def test_lazy(self):
+        m = self.add_module(True)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+        # storing the module did not parse the arguments
+        for s in self.texts(m):
+            self.assertTrue(s.lazy_arg is not None)
+        m = self.add_module(True)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        for s in self.texts(m):
+            self.assertTrue(s.lazy_arg is not None)
+        self.assertEqual([s.arg for s in self.texts(m)],
+                         ['example', 'A multi-line\ndescription.',
+                          'RFC 7950'])
+        for s in self.texts(m):
+            self.assertTrue(s.lazy_arg is None)
+
+    def test_not_lazy(self):
+        # an entry stored with lazy arguments is used without them
+        self.add_module(True)
+        m = self.add_module(False)
+        self.assertEqual(self.cache.hits, 1)
+        for s in self.texts(m):
+            self.assertFalse(hasattr(s, 'lazy_arg'))
+        self.assertEqual([s.arg for s in self.texts(m)],
+                         ['example', 'A multi-line\ndescription.',
+                          'RFC 7950'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+# check that the server does not share state between requests
+
+import json
+import optparse
+import unittest
+
+import pyang
+from pyang import plugin
+from pyang import serve
+
+def new_server():
+    repos = pyang.FileRepository('.:../../modules', use_env=False)
+    ctx = pyang.Context(repos)
+    ctx.opts = optparse.Values({'keep_comments': False, 'deviations': [],
+                                'features': [], 'ignore_errors': False,
+                                'ignore_error_tags': [], 'errors': [],
+                                'warnings': [], 'verbose': False})
+    return (ctx, serve.Server(ctx, {}))
+
+class TestServer(unittest.TestCase):
+    def test_identity_index(self):
+        (template, server) = new_server()
+        for i in range(5):
+            result = server.validate({'files': ['c.yang']})
+            self.assertEqual(result, {'exit_code': 0, 'errors': []})
+        # each request has its own index, which is not kept
+        self.assertFalse(server.new_context().identity_index is
+                         template.identity_index)
+        self.assertEqual(template.identity_index._identities, [])
+        self.assertEqual(len(template.identity_index._modules), 0)
+
+    def test_requests(self):
+        (template, server) = new_server()
+        for i in range(3):
+            for filename in ('a.yang', 'c.yang'):
+                result = server.validate({'files': [filename]})
+                self.assertEqual(result['exit_code'], 0)
+        self.assertEqual(template.modules, {})
+        self.assertEqual(list(template.errors), [])
+
+    def test_unknown_feature(self):
+        # checked by validate_modules(), as in bin/pyang
+        (template, server) = new_server()
+        template.features = {'c': ['nosuch']}
+        result = server.validate({'files': ['c.yang']})
+        self.assertEqual(result['exit_code'], 1)
+        self.assertEqual(result['message'],
+                         "unknown feature nosuch in module c")
+
+    def test_plugin_exit(self):
+        # a plugin which exits stops the server, as it stops pyang
+        class ExitPlugin(plugin.PyangPlugin):
+            def pre_validate_ctx(self, ctx, modules):
+                raise SystemExit(3)
+        (template, server) = new_server()
+        plugin.plugins.append(ExitPlugin())
+        try:
+            req = {'jsonrpc': '2.0', 'id': 1, 'method': 'validate',
+                   'params': {'files': ['c.yang']}}
+            self.assertRaises(SystemExit, server.handle, json.dumps(req))
+        finally:
+            plugin.plugins.pop()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+"""Helpers shared by the unit tests of pyang.types"""
+
+import pyang
+
+def new_context(*texts):
+    """Validate the modules in `texts` in a new context.
+
+    Returns the context and the modules."""
+    ctx = pyang.Context(pyang.FileRepository(use_env=False))
+    modules = [ctx.add_module('m%d.yang' % i, text)
+               for (i, text) in enumerate(texts)]
+    ctx.validate()
+    return (ctx, modules)
+
+def validate(text):
+    """Return the module in `text`, validated without errors"""
+    (ctx, [m]) = new_context(text)
+    assert list(ctx.errors) == [], ctx.errors
+    return m
+
+def valid(spec, s):
+    """Return True if str_to_val() and validate() of the TypeSpec `spec`
+    accept the string `s`"""
+    errors = []
+    try:
+        val = spec.str_to_val(errors, None, s)
+        if val is None or errors != []:
+            return False
+        return spec.validate(errors, None, val) and errors == []
+    except TypeError:
+        # an integer type compares the strings 'min' and 'max' with
+        # integers
+        return False
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+# check that TypeSpec.validate_batch() gives the same result as
+# str_to_val() and validate() for each value, except for the integers
+# which are read with different lexical rules
+
+import sys
+import subprocess
+import unittest
+
+from pyang import types
+
+from helpers import validate, valid
+
+MODULE = '''
+module a {
+  yang-version 1.1;
+  namespace "urn:a";
+  prefix a;
+
+  typedef small {
+    type int8 {
+      range "min..0 | 50..max";
+    }
+  }
+  leaf int {
+    type int32 {
+      range "-10..-1 | 5 | 10..max";
+    }
+  }
+  leaf small {
+    type small {
+      range "min..-100 | -5..0 | 50..60";
+    }
+  }
+  leaf int64 {
+    type int64;
+  }
+  leaf uint64 {
+    type uint64 {
+      range "0..10 | 18446744073709551610..max";
+    }
+  }
+  leaf pattern {
+    type string {
+      pattern "[a-z]+";
+      pattern "x.*" {
+        modifier invert-match;
+      }
+      pattern ".{2,4}";
+    }
+  }
+  leaf union {
+    type union {
+      type small;
+      type string {
+        pattern "1[0-9]*";
+      }
+      type uint64 {
+        range "max";
+      }
+      type enumeration {
+        enum none;
+      }
+    }
+  }
+  leaf int64-union {
+    type union {
+      type int64;
+      type enumeration {
+        enum none;
+      }
+    }
+  }
+  leaf ref {
+    type leafref {
+      path "../small";
+    }
+  }
+}
+'''
+
+# values which are read in the same way by validate_batch() and
+# str_to_val(), see LEXICAL below
+INTEGERS = ['-129', '-128', '-127', '-101', '-100', '-99', '-11', '-10',
+            '-6', '-5', '-1', '-0', '0', '+0', '1', '4', '5', '+5', '6',
+            '9', '10', '49', '50', '60', '61', '127', '128',
+            '2147483647', '2147483648',
+            '9223372036854775807', '9223372036854775808',
+            '-9223372036854775808', '-9223372036854775809',
+            '18446744073709551609', '18446744073709551610',
+            '18446744073709551615', '18446744073709551616',
+            '', '-', 'a', '1.0', '1e3', 'none']
+
+# integers which validate_batch() reads with the lexical rules of XML
+# Schema, and str_to_val() with python's int(s, 0); value:valid in batch
+LEXICAL = {'010': True, '+010': True, '-05': True, '0x10': False,
+           '0X1f': False, ' 5': False, '5 ': False, '\t-5\n': False}
+
+STRINGS = ['', 'a', 'ab', 'abc', 'abcd', 'abcde', 'x', 'xa', 'ax', 'a1',
+           'AB', 'none', '1', '10']
+
+class TestValidateBatch(unittest.TestCase):
+    def setUp(self):
+        self.module = validate(MODULE)
+
+    def tearDown(self):
+        types._numpy_module = False
+
+    def spec(self, name):
+        leaf = self.module.search_one('leaf', name)
+        return leaf.search_one('type').i_type_spec
+
+    def check(self, name, values):
+        spec = self.spec(name)
+        expected = [i for (i, s) in enumerate(values) if not valid(spec, s)]
+        self.assertEqual(spec.validate_batch(values), expected)
+        # also with each value repeated, since results are reused
+        self.assertEqual(spec.validate_batch(values + values),
+                         expected + [i + len(values) for i in expected])
+        return [values[i] for i in expected]
+
+    def test_range_intersection(self):
+        self.assertEqual(self.spec('small').int_ranges(),
+                         [(-128, -100), (-5, 0), (50, 60)])
+        self.check('int', INTEGERS)
+        bad = self.check('small', INTEGERS)
+        self.assertFalse('-128' in bad)
+        self.assertTrue('-99' in bad)
+        self.assertTrue('61' in bad)
+
+    def test_outside_int64(self):
+        self.check('int64', INTEGERS)
+        bad = self.check('uint64', INTEGERS)
+        self.assertFalse('18446744073709551610' in bad)
+        self.assertTrue('18446744073709551616' in bad)
+
+    def test_patterns(self):
+        bad = self.check('pattern', STRINGS)
+        self.assertFalse('abcd' in bad)
+        self.assertTrue('xa' in bad)
+        self.assertTrue('abcde' in bad)
+
+    def test_union(self):
+        bad = self.check('union', INTEGERS + STRINGS)
+        # each value is valid for one member type
+        for s in ('-99', '50', '128', '18446744073709551615', 'none'):
+            self.assertFalse(s in bad, s)
+        for s in ('-129', '4', '9223372036854775808', 'a'):
+            self.assertTrue(s in bad, s)
+
+    def test_leafref(self):
+        self.assertEqual(self.spec('ref').validate_batch(INTEGERS),
+                         self.spec('small').validate_batch(INTEGERS))
+        self.check('ref', INTEGERS)
+
+    def test_lexical_rules(self):
+        values = sorted(LEXICAL)
+        expected = [i for (i, s) in enumerate(values) if not LEXICAL[s]]
+        for name in ('int', 'int64', 'int64-union'):
+            spec = self.spec(name)
+            self.assertEqual(spec.validate_batch(values), expected, name)
+            # these values are not in INTEGERS, since str_to_val()
+            # accepts them; it reads '010' as octal in python 2, and
+            # rejects it in python 3
+            for s in values:
+                if not LEXICAL[s]:
+                    self.assertTrue(valid(spec, s), (name, s))
+        types._numpy_module = None
+        self.assertEqual(spec.validate_batch(values), expected)
+
+    def test_without_numpy(self):
+        types._numpy_module = None
+        for name in ('int', 'small', 'int64', 'uint64', 'union', 'ref'):
+            self.check(name, INTEGERS)
+
+    def test_numpy_not_imported(self):
+        # numpy is imported the first time it is needed
+        code = ('import sys, pyang; from pyang import types; '
+                'sys.exit("numpy" in sys.modules)')
+        self.assertEqual(subprocess.call([sys.executable, '-c', code]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
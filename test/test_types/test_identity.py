@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+# check types.IdentityIndex against the identities in two modules
+
+import unittest
+
+from helpers import new_context
+
+MODULE_A = '''
+module a {
+  namespace "urn:a";
+  prefix a;
+
+  identity x;
+  identity y {
+    base x;
+  }
+  identity y2 {
+    base x;
+  }
+  identity other;
+}
+'''
+
+MODULE_B = '''
+module b {
+  yang-version 1.1;
+  namespace "urn:b";
+  prefix b;
+  import a {
+    prefix a;
+  }
+
+  identity z {
+    base a:y;
+  }
+  identity w {
+    base a:x;
+    base z;
+  }
+  identity v {
+    base a:y2;
+  }
+  leaf x {
+    type identityref {
+      base a:x;
+    }
+  }
+  leaf xz {
+    type identityref {
+      base a:x;
+      base z;
+    }
+  }
+  leaf other {
+    type identityref {
+      base a:other;
+    }
+  }
+}
+'''
+
+MODULE_C = '''
+module c {
+  namespace "urn:c";
+  prefix c;
+
+  identity c1 {
+    base c2;
+  }
+  identity c2 {
+    base c1;
+  }
+  identity c3 {
+    base c1;
+  }
+}
+'''
+
+class TestIdentityIndex(unittest.TestCase):
+    def setUp(self):
+        (self.ctx, [self.a, self.b]) = new_context(MODULE_A, MODULE_B)
+        self.assertEqual(list(self.ctx.errors), [])
+        self.index = self.ctx.identity_index
+
+    def id(self, name):
+        if name in self.a.i_identities:
+            return self.a.i_identities[name]
+        return self.b.i_identities[name]
+
+    def ids(self, *names):
+        return frozenset([self.id(name) for name in names])
+
+    def names(self, identities):
+        return sorted([i.arg for i in identities])
+
+    def spec(self, name):
+        return self.b.search_one('leaf', name).search_one('type').i_type_spec
+
+    def test_ancestors(self):
+        index = self.index
+        self.assertEqual(index.ancestors(self.id('x')), frozenset())
+        self.assertEqual(index.ancestors(self.id('z')), self.ids('x', 'y'))
+        self.assertEqual(index.ancestors(self.id('w')),
+                         self.ids('x', 'y', 'z'))
+        self.assertEqual(index.ancestors(self.id('v')), self.ids('x', 'y2'))
+        self.assertTrue(index.is_derived_from(self.id('w'), self.id('y')))
+        self.assertFalse(index.is_derived_from(self.id('w'), self.id('w')))
+        self.assertTrue(index.is_derived_from_or_self(self.id('w'),
+                                                      self.id('w')))
+        self.assertFalse(index.is_derived_from(self.id('v'), self.id('y')))
+
+    def test_descendants(self):
+        index = self.index
+        self.assertEqual(index.descendants(self.id('x')),
+                         self.ids('y', 'y2', 'z', 'w', 'v'))
+        self.assertEqual(index.descendants(self.id('y')), self.ids('z', 'w'))
+        self.assertEqual(index.descendants(self.id('w')), frozenset())
+        self.assertEqual(self.names(index.derived(self.id('x'))),
+                         ['w', 'y', 'y2'])
+        for i in self.ids('x', 'y', 'y2', 'z', 'w', 'v', 'other'):
+            for j in index.descendants(i):
+                self.assertTrue(index.is_derived_from(j, i))
+
+    def test_derived_from_all(self):
+        index = self.index
+        res = index.derived_from_all([self.id('x')])
+        self.assertEqual(self.names(res), ['v', 'w', 'y', 'y2', 'z'])
+        # in the order they were added, i.e., module a first
+        self.assertEqual([i.i_module.arg for i in res],
+                         ['a', 'a', 'b', 'b', 'b'])
+        self.assertEqual(index.derived_from_all([self.id('x'),
+                                                 self.id('z')]),
+                         [self.id('w')])
+        self.assertEqual(index.derived_from_all([self.id('y'),
+                                                 self.id('y2')]), [])
+        self.assertEqual(index.derived_from_all([]), [])
+
+    def test_valid_identities(self):
+        self.assertEqual(self.spec('x').valid_identities(),
+                         self.index.derived_from_all([self.id('x')]))
+        self.assertEqual(self.spec('xz').valid_identities(), [self.id('w')])
+        self.assertEqual(self.spec('other').valid_identities(), [])
+
+    def test_del_module(self):
+        index = self.index
+        x = self.id('x')
+        # compute the cached sets before the module is removed
+        index.ancestors(self.id('w'))
+        index.descendants(x)
+        self.ctx.del_module(self.b)
+        self.assertEqual(index.descendants(x), self.ids('y', 'y2'))
+        self.assertEqual(self.names(index.derived(x)), ['y', 'y2'])
+        self.assertEqual(self.names(index.derived_from_all([x])),
+                         ['y', 'y2'])
+        self.assertEqual(self.names(self.spec('x').valid_identities()),
+                         ['y', 'y2'])
+        self.assertEqual(index.ancestors(self.id('y')), self.ids('x'))
+        index.add_module(self.b)
+        self.assertEqual(index.descendants(x),
+                         self.ids('y', 'y2', 'z', 'w', 'v'))
+        self.assertEqual(index.ancestors(self.id('w')),
+                         self.ids('x', 'y', 'z'))
+
+    def test_modules_in_other_context(self):
+        # each context has its own index
+        (ctx, [a]) = new_context(MODULE_A)
+        self.assertEqual(self.names(ctx.identity_index.descendants(
+                    a.i_identities['x'])), ['y', 'y2'])
+        self.assertEqual(len(self.index.descendants(self.id('x'))), 5)
+
+    def test_cyclic_bases(self):
+        (ctx, [c]) = new_context(MODULE_C)
+        tags = [tag for (pos, tag, args) in ctx.errors]
+        self.assertTrue('CIRCULAR_DEPENDENCY' in tags)
+        index = ctx.identity_index
+        [c1, c2, c3] = [c.i_identities[n] for n in ('c1', 'c2', 'c3')]
+        self.assertTrue(index.ancestors(c1) <= frozenset([c1, c2]))
+        self.assertTrue(c1 in index.ancestors(c3))
+        self.assertTrue(index.descendants(c1) <= frozenset([c1, c2, c3]))
+        self.assertTrue(c3 in index.descendants(c1))
+        self.assertEqual(index.derived_from_all([c1, c3]), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+# check that types.PatternCache compiles each pattern once
+
+import unittest
+
+from pyang import types
+
+from helpers import new_context
+
+MODULE = '''
+module a {
+  namespace "urn:a";
+  prefix a;
+  leaf x {
+    type string {
+      pattern "[a-z]+";
+      pattern "x.*";
+    }
+  }
+}
+'''
+
+class TestPatternCache(unittest.TestCase):
+    def setUp(self):
+        self.compiled = []
+        self.compile_pattern = types.compile_pattern
+        def compile_pattern(pattern):
+            self.compiled.append(pattern)
+            return self.compile_pattern(pattern)
+        types.compile_pattern = compile_pattern
+
+    def tearDown(self):
+        types.compile_pattern = self.compile_pattern
+
+    def test_hits_and_misses(self):
+        cache = types.PatternCache()
+        a = cache.get('[a-z]+')
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertTrue(cache.get('[a-z]+') is a)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.get('[0-9]+')
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(self.compiled, ['[a-z]+', '[0-9]+'])
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+    def test_lru_eviction(self):
+        cache = types.PatternCache(size=2)
+        cache.get('a')
+        cache.get('b')
+        # 'a' is now the most recently used, so 'b' is dropped
+        cache.get('a')
+        cache.get('c')
+        self.assertEqual(len(cache), 2)
+        cache.get('a')
+        cache.get('c')
+        self.assertEqual(self.compiled, ['a', 'b', 'c'])
+        cache.get('b')
+        self.assertEqual(self.compiled, ['a', 'b', 'c', 'b'])
+        self.assertEqual((cache.hits, cache.misses), (3, 4))
+
+    def test_cached_error(self):
+        cache = types.PatternCache()
+        res = cache.get('[a-')
+        self.assertTrue(isinstance(res, str))
+        self.assertEqual(cache.get('[a-'), res)
+        self.assertEqual(self.compiled, ['[a-'])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_cached_error_reported(self):
+        text = MODULE.replace('x.*', '[a-')
+        for i in range(2):
+            (ctx, [m]) = new_context(text)
+            tags = [tag for (pos, tag, args) in ctx.errors]
+            self.assertEqual(tags, ['PATTERN_ERROR'])
+        self.assertEqual(self.compiled.count('[a-'), 1)
+
+    def test_shared_by_contexts(self):
+        types.pattern_cache.clear()
+        (ctx1, [m1]) = new_context(MODULE)
+        self.assertEqual(types.pattern_cache.misses, 2)
+        (ctx2, [m2]) = new_context(MODULE)
+        self.assertEqual(types.pattern_cache.misses, 2)
+        self.assertEqual(types.pattern_cache.hits, 2)
+        self.assertEqual(sorted(self.compiled), ['[a-z]+', 'x.*'])
+        s1 = m1.search_one('leaf').search_one('type').i_type_spec
+        s2 = m2.search_one('leaf').search_one('type').i_type_spec
+        for s in (s1, s2):
+            self.assertEqual(s.str_to_val([], None, 'xyz'), 'xyz')
+            self.assertFalse(s.validate([], None, 'abc'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+
+# check that a union which skips member types by their lexical tests
+# gives the same result as trying each member type in order
+
+import pickle
+import unittest
+
+from pyang import types
+
+from helpers import validate, valid
+
+MODULE = r'''
+module a {
+  yang-version 1.1;
+  namespace "urn:a";
+  prefix a;
+
+  leaf enum-int {
+    type union {
+      type enumeration {
+        enum "1";
+        enum one;
+      }
+      type int8;
+    }
+  }
+  leaf int-enum {
+    type union {
+      type int8 {
+        range "0..10";
+      }
+      type enumeration {
+        enum "10";
+        enum "11";
+        enum min;
+      }
+    }
+  }
+  leaf decimal {
+    type union {
+      type decimal64 {
+        fraction-digits 2;
+        range "min..10.5 | 20..max";
+      }
+      type string {
+        pattern "m[a-z]*";
+      }
+    }
+  }
+  leaf dot {
+    type union {
+      type string {
+        pattern "a.c";
+      }
+      type boolean;
+    }
+  }
+  leaf negated {
+    type union {
+      type string {
+        pattern "[^a-z]+";
+      }
+      type string {
+        pattern "[a-z]+";
+        pattern "x.*" {
+          modifier invert-match;
+        }
+      }
+    }
+  }
+  leaf subtraction {
+    type union {
+      type string {
+        pattern "[a-z-[aeiou]]+";
+      }
+      type empty;
+      type int8;
+    }
+  }
+  leaf nested {
+    type union {
+      type union {
+        type int8;
+        type enumeration {
+          enum x;
+        }
+      }
+      type string {
+        pattern '\d+\.\d+';
+      }
+    }
+  }
+}
+'''
+
+VALUES = ['', ' ', '0', '1', '2', '10', '10.5', '10.50', '10.501', '11',
+          '15', '20', '-1', '-129', '128', '1.0', '1.2.3',
+          'min', 'max', 'm', 'mx', 'M', 'one', 'two', 'x', 'xy',
+          'true', 'false', 'abc', 'a.c', 'a-c', 'a\nc', 'ac', 'aBc',
+          'ABC', 'A1', '-', 'a', 'b', 'bcd', 'bcda', 'bcdA', 'xyz', '_',
+          u'\xe9', u'a\xe9c']
+
+def first_member(members, s):
+    """Return the first type in `members` which matches `s`"""
+    for spec in members:
+        if valid(spec, s):
+            return spec
+    return None
+
+class TestUnion(unittest.TestCase):
+    def setUp(self):
+        self.module = validate(MODULE)
+
+    def unions(self):
+        for leaf in self.module.search('leaf'):
+            yield (leaf.arg, leaf.search_one('type').i_type_spec)
+
+    def test_same_result(self):
+        for (name, spec) in self.unions():
+            members = [t.i_type_spec for t in spec.types]
+            for s in VALUES:
+                self.assertEqual(valid(spec, s),
+                                 first_member(members, s) is not None,
+                                 (name, s))
+
+    def test_skipped_members(self):
+        # a member type is skipped only if it does not match, so the
+        # first member type which matches is the same
+        for (name, spec) in self.unions():
+            valid(spec, '')
+            members = [t.i_type_spec for t in spec.types]
+            self.assertEqual([m for (m, _f) in spec._dispatch], members)
+            for s in VALUES:
+                tried = [m for (m, accepts) in spec._dispatch
+                         if accepts is None or accepts(s)]
+                for m in members:
+                    if m not in tried:
+                        self.assertFalse(valid(m, s), (name, s))
+                self.assertTrue(first_member(members, s) is
+                                first_member(tried, s), (name, s))
+
+    def test_skips(self):
+        def skipped(name, member, s):
+            spec = dict(self.unions())[name]
+            valid(spec, s)
+            accepts = spec._dispatch[member][1]
+            return accepts is not None and not accepts(s)
+        # enumerations and integers
+        self.assertTrue(skipped('enum-int', 0, '2'))
+        self.assertTrue(skipped('enum-int', 1, 'one'))
+        self.assertFalse(skipped('enum-int', 0, '1'))
+        self.assertTrue(skipped('int-enum', 0, 'min'))
+        # decimal64 never accepts 'min' and 'max'
+        self.assertTrue(skipped('decimal', 0, 'min'))
+        self.assertTrue(skipped('decimal', 0, 'max'))
+        self.assertFalse(skipped('decimal', 1, 'max'))
+        # '.' matches any character but newlines
+        self.assertFalse(skipped('dot', 0, 'a-c'))
+        self.assertFalse(skipped('dot', 0, u'a\xe9c'))
+        self.assertTrue(skipped('dot', 0, 'a\nc'))
+        # a negated class matches the characters outside the class
+        self.assertFalse(skipped('negated', 0, 'ABC'))
+        self.assertFalse(skipped('negated', 0, '-'))
+        self.assertTrue(skipped('negated', 0, 'abc'))
+        # an invert-match pattern is not used to skip a member type
+        self.assertFalse(skipped('negated', 1, 'xyz'))
+        # the subtracted characters may be tried, but do not match
+        self.assertTrue(skipped('subtraction', 0, 'bcdA'))
+        self.assertFalse(skipped('subtraction', 0, 'bcd'))
+        spec = dict(self.unions())['subtraction']
+        self.assertFalse(valid(spec.types[0].i_type_spec, 'bcda'))
+        self.assertTrue(skipped('subtraction', 1, ''))
+
+    def test_first_match(self):
+        spec = dict(self.unions())['enum-int']
+        members = [t.i_type_spec for t in spec.types]
+        self.assertTrue(first_member(members, '1') is members[0])
+        self.assertTrue(first_member(members, '2') is members[1])
+        spec = dict(self.unions())['int-enum']
+        members = [t.i_type_spec for t in spec.types]
+        self.assertTrue(first_member(members, '10') is members[0])
+        self.assertTrue(first_member(members, '11') is members[1])
+        self.assertTrue(first_member(members, 'min') is members[1])
+
+    def test_pickle(self):
+        for (name, spec) in self.unions():
+            valid(spec, '1')
+            self.assertTrue(hasattr(spec, '_dispatch'))
+            spec2 = pickle.loads(pickle.dumps(spec, 2))
+            self.assertFalse(hasattr(spec2, '_dispatch'))
+            for s in VALUES:
+                self.assertEqual(valid(spec2, s), valid(spec, s), (name, s))
+
+if __name__ == '__main__':
+    unittest.main()